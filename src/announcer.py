@@ -3,6 +3,7 @@
 # ===============================
 # src/announcer.py — events (MG/ZS) + VS reminder + weekly calendar
 from __future__ import annotations
+import asyncio
 import discord
 from datetime import datetime
 from .config import MENTION_URGENT
@@ -13,41 +14,63 @@ USE_EVERYONE = True
 # Allowed mentions
 ALLOWED_SAFE = discord.AllowedMentions(roles=True, users=False, everyone=False)
 ALLOWED_WITH_EVERYONE = discord.AllowedMentions(roles=True, users=False, everyone=True)
+# Indexado por USE_EVERYONE (False=0 → safe, True=1 → con everyone)
+_ALLOWED_BY_EVERYONE = (ALLOWED_SAFE, ALLOWED_WITH_EVERYONE)
+_ALLOWED_URGENT = _ALLOWED_BY_EVERYONE[USE_EVERYONE]
+
+# Prefijo de urgentes con roles desde .env (MENTION_URGENT/USE_EVERYONE no cambian en runtime)
+_URGENT_PREFIX_PARTS = [p for p in (MENTION_URGENT, "@everyone" if USE_EVERYONE else "") if p]
+_URGENT_PREFIX = " ".join(_URGENT_PREFIX_PARTS) + " " if _URGENT_PREFIX_PARTS else ""
+
+# Plantillas de mensajes (se formatean con % en cada envío)
+_TPL_VS_REMINDER = (
+    "⏳ **VS — %s**\n"
+    "Últimos **15 min** del día (server). Registra los puntos del VS con `/points <name> <amount>`."
+)
+_TPL_EVENT = "⏰ %s — %s %s (server)\nStarts in %s\n*%s*"
+_TPL_URGENT = "%s🚨 %s — %s %s (server)\n⚠️ Starts in %s — %s\n*%s*"
+_CAL_FMT = "• {} at {} — {}".format
+
+
+# Límite de envíos simultáneos a Discord (los anuncios de un mismo tick se solapan)
+_SEND_SEM = asyncio.Semaphore(5)
+
+
+async def _send(channel, *args, **kwargs):
+    async with _SEND_SEM:
+        return await channel.send(*args, **kwargs)
+
+
+# ETAs frecuentes (< 1 día) precalculadas: minutos y horas exactas
+_ETA_MIN_LUT = ("<1m",) + tuple(f"{i}m" for i in range(1, 60))
+_ETA_HOUR_LUT = ("",) + tuple(f"{i}h" for i in range(1, 24))
 
 
 def _fmt_eta(delta_seconds: int) -> str:
-    s = max(0, delta_seconds)
-    m, s = divmod(s, 60)
-    h, m = divmod(m, 60)
+    mins = max(0, delta_seconds) // 60
+    if mins < 60:
+        return _ETA_MIN_LUT[mins]
+    h, m = divmod(mins, 60)
+    if h < 24:
+        return _ETA_HOUR_LUT[h] if m == 0 else f"{h}h {m}m"
     d, h = divmod(h, 24)
-    parts = []
-    if d:
-        parts.append(f"{d}d")
+    parts = [f"{d}d"]
     if h:
-        parts.append(f"{h}h")
+        parts.append(_ETA_HOUR_LUT[h])
     if m:
-        parts.append(f"{m}m")
-    if not parts:
-        parts.append("<1m")
+        parts.append(_ETA_MIN_LUT[m])
     return " ".join(parts)
 
 
 async def send_vs_register_reminder(channel, server_date_str: str):
-    await channel.send(
-        f"⏳ **VS — {server_date_str}**\n"
-        f"Últimos **15 min** del día (server). Registra los puntos del VS con `/points <name> <amount>`."
-    )
+    await _send(channel, _TPL_VS_REMINDER % server_date_str)
 
 
 async def send_event_before(channel, event_code: str, event_full: str,
                             server_date_str: str, server_time_str: str,
                             eta_seconds: int):
     eta = _fmt_eta(eta_seconds)
-    await channel.send(
-        f"⏰ {event_code} — {server_date_str} {server_time_str} (server)\n"
-        f"Starts in {eta}\n"
-        f"*{event_full}*"
-    )
+    await _send(channel, _TPL_EVENT % (event_code, server_date_str, server_time_str, eta, event_full))
 
 
 async def send_event_before_urgent(channel,
@@ -57,38 +80,22 @@ async def send_event_before_urgent(channel,
                                    server_time_str: str,
                                    eta_seconds: int,
                                    final: bool = False):
-    eta = _fmt_eta(eta_seconds)
     call = "final call!" if final else "be ready!"
-
-    # Prefijo con roles desde .env
-    prefix_parts = []
-    if MENTION_URGENT:
-        prefix_parts.append(MENTION_URGENT)
-    if USE_EVERYONE:
-        prefix_parts.append("@everyone")
-
-    prefix = " ".join(prefix_parts) + " " if prefix_parts else ""
-
-    # AllowedMentions según si usamos everyone
-    allowed = ALLOWED_WITH_EVERYONE if USE_EVERYONE else ALLOWED_SAFE
-
     content = (
-        f"{prefix}🚨 {event_code} — {server_date_str} {server_time_str} (server)\n"
-        f"⚠️ Starts in {eta} — {call}\n"
-        f"*{event_full}*"
+        _TPL_URGENT % (_URGENT_PREFIX, event_code, server_date_str, server_time_str,
+                       _fmt_eta(eta_seconds), call, event_full)
     ).strip()
 
     try:
-        await channel.send(content=content, allowed_mentions=allowed)
+        await _send(channel, content=content, allowed_mentions=_ALLOWED_URGENT)
     except discord.Forbidden:
-        # Fallback: reenviar sin mentions
-        safe = content.replace("@everyone", "").strip()
-        await channel.send(content=safe, allowed_mentions=ALLOWED_SAFE)
+        # Fallback: reenviar sin mentions (la versión sin @everyone solo se arma aquí)
+        await _send(channel, content=content.replace("@everyone", "").strip(), allowed_mentions=ALLOWED_SAFE)
 
 
 async def send_week_calendar(channel, entries):
     # entries: list of (day_label, time_label, label)
     if not entries:
         return
-    lines = "\n".join(f"• {d} at {t} — {label}" for d, t, label in entries)
-    await channel.send("📅 **This Week's Event Calendar**\n" + lines)
+    lines = "\n".join(_CAL_FMT(d, t, label) for d, t, label in entries)
+    await _send(channel, "📅 **This Week's Event Calendar**\n" + lines)
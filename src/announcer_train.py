@@ -12,6 +12,15 @@
 from __future__ import annotations
 from typing import Iterable, Sequence
 
+# Plantillas de mensajes (se formatean con % en cada envío)
+_TPL_TRAIN_DAY = "🚆 **Train — %s**\n• Driver: **%s**\n• Passenger VIP: **%s** (backup **%s**)"
+# Línea semanal (con salto previo) y helpers de formato
+_DAY_LINE = "\n• {} | Driver = {} — VIP = {}{}".format
+_BOLD = "**{}**".format
+_PENDING = "Pending"
+_TITLE_WEEK_FULL = "📅 **Train — Weekly Lineup (Mon–Sun)**"
+_TITLE_WEEK_MONFRI = "📅 **Train — Weekly Lineup (Mon–Fri)**"
+
 def _fmt_name(s: str | None, pending: str = "Pending", dash_as_pending: bool = True) -> str:
     if not s:
         return pending
@@ -24,32 +33,21 @@ async def send_train_day(channel, *, day_label: str, driver: str, passenger: str
     drv = _fmt_name(driver, pending="—", dash_as_pending=False)
     pax = _fmt_name(passenger, pending="Pending")
     bkp = _fmt_name(backup, pending="—", dash_as_pending=False)
-    await channel.send(
-        f"🚆 **Train — {when_title}**\n"
-        f"• Driver: **{drv}**\n"
-        f"• Passenger VIP: **{pax}** (backup **{bkp}**)"
+    await channel.send(_TPL_TRAIN_DAY % (when_title, drv, pax, bkp))
+
+def _week_line(e: Sequence[str]) -> str:
+    # e: (day_label, driver, pax) ó (day_label, driver, pax, backup)
+    drv = _fmt_name(e[1], pending="—", dash_as_pending=False)
+    pax = _fmt_name(e[2], pending=_PENDING)
+    bkp = _fmt_name(e[3], pending=None) if len(e) >= 4 and e[3] else None
+    return _DAY_LINE(
+        e[0],
+        drv if drv == _PENDING else _BOLD(drv),
+        pax if pax == _PENDING else _BOLD(pax),
+        f" (_{bkp}_)" if bkp else "",
     )
 
 async def send_train_week(channel, entries: Iterable[Sequence[str]]):
     entries = list(entries)
-    title = "📅 **Train — Weekly Lineup (Mon–Sun)**" if len(entries) >= 7 else "📅 **Train — Weekly Lineup (Mon–Fri)**"
-
-    lines = []
-    for e in entries:
-        if len(e) >= 4:
-            day_label, driver, pax, bkp = e[0], e[1], e[2], e[3]
-        else:
-            day_label, driver, pax = e[0], e[1], e[2]
-            bkp = None
-
-        drv = _fmt_name(driver, pending="—", dash_as_pending=False)
-        pax_fmt = _fmt_name(pax, pending="Pending")
-        bkp_fmt = _fmt_name(bkp, pending=None) if bkp else None
-
-        drv_txt = drv if drv == "Pending" else f"**{drv}**"
-        pax_txt = pax_fmt if pax_fmt == "Pending" else f"**{pax_fmt}**"
-        bkp_txt = f" (_{bkp_fmt}_)" if bkp_fmt else ""
-
-        lines.append(f"• {day_label} | Driver = {drv_txt} — VIP = {pax_txt}{bkp_txt}")
-
-    await channel.send(title + "\n" + "\n".join(lines))
+    title = _TITLE_WEEK_FULL if len(entries) >= 7 else _TITLE_WEEK_MONFRI
+    await channel.send("".join([title, *map(_week_line, entries)]))
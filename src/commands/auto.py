@@ -4,13 +4,8 @@
 # src/commands/auto.py — enable/disable automation features at runtime
 import discord
 from discord import app_commands
-from ..config import ROLE_ADMIN, ROLE_OFFICIAL
 from ..storage import set_auto_toggle, get_auto_toggle
-
-
-def has_role(member: discord.Member) -> bool:
-    names = {r.name for r in getattr(member, "roles", [])}
-    return any(r in names for r in ROLE_ADMIN + ROLE_OFFICIAL)
+from ..utils.auth import require_role
 
 
 @app_commands.command(name="auto", description="Toggle automation: /auto <feature> <on|off>")
@@ -25,8 +20,7 @@ def has_role(member: discord.Member) -> bool:
     app_commands.Choice(name="on", value="on"),
     app_commands.Choice(name="off", value="off"),
 ])
+@require_role
 async def auto(interaction: discord.Interaction, feature: app_commands.Choice[str], mode: app_commands.Choice[str]):
-    if not isinstance(interaction.user, discord.Member) or not has_role(interaction.user):
-        return await interaction.response.send_message("No permission.", ephemeral=True)
     set_auto_toggle(feature.value, mode.value == "on")
     await interaction.response.send_message(f"✅ {feature.value} set to {mode.value}")
@@ -2,15 +2,12 @@
 # src/commands/csv_tools.py
 # ===============================
 import os
+import re
 import discord
 from discord import app_commands
 from datetime import datetime, timedelta, timezone
 from ..utils.csv_utils import week_csv_names
-from ..config import ROLE_ADMIN, ROLE_OFFICIAL
-
-def has_role(member: discord.Member) -> bool:
-    names = {r.name for r in getattr(member, "roles", [])}
-    return any(r in names for r in ROLE_ADMIN + ROLE_OFFICIAL)
+from ..utils.auth import require_role
 
 @app_commands.command(name="csv", description="Attach CSV files for the current or a specific week")
 @app_commands.describe(kind="records|draws|both", week="current|previous|YYYY-WW|YYYYMMDD (any date within the week)")
@@ -19,11 +16,9 @@ def has_role(member: discord.Member) -> bool:
     app_commands.Choice(name="draws", value="draws"),
     app_commands.Choice(name="both", value="both"),
 ])
+@require_role
 async def csv_tools(interaction: discord.Interaction, kind: app_commands.Choice[str], week: str | None = None):
-    if not isinstance(interaction.user, discord.Member) or not has_role(interaction.user):
-        return await interaction.response.send_message("No permission.", ephemeral=True)
-
-    target_dt = _resolve_date(week)
+    target_dt = _resolve_date(week, datetime.now(timezone.utc))
     names = week_csv_names(target_dt)
     files = []
     if kind.value in ("records", "both") and os.path.exists(names["registros"]):
@@ -35,16 +30,16 @@ async def csv_tools(interaction: discord.Interaction, kind: app_commands.Choice[
         return await interaction.response.send_message(f"No CSVs for the week (Sunday {names['sunday']}).")
     await interaction.response.send_message(content=f"📎 CSVs for week (Sunday {names['sunday']})", files=files)
 
-def _resolve_date(sw: str | None) -> datetime:
-    today = datetime.now(timezone.utc)
-    if not sw or sw == "current":
+_WEEK_RE = re.compile(r"\A(?:(current)|(previous)|(\d{4})-(\d{2})|(\d{8}))\Z")
+
+def _resolve_date(sw: str | None, today: datetime | None = None) -> datetime:
+    today = today or datetime.now(timezone.utc)
+    m = _WEEK_RE.match(sw) if sw else None
+    if m is None or m.group(1):  # vacío / current / no reconocido
         return today
-    if sw == "previous":
+    if m.group(2):  # previous
         return today - timedelta(weeks=1)
-    if len(sw) == 7 and sw[4] == '-':  # YYYY-WW
-        y, w = sw.split('-')
-        y, w = int(y), int(w)
-        return datetime.fromisocalendar(y, w, 1, tzinfo=timezone.utc)
-    if len(sw) == 8 and sw.isdigit():  # YYYYMMDD
-        return datetime.strptime(sw, "%Y%m%d").replace(tzinfo=timezone.utc)
-    return today
+    if m.group(3):  # YYYY-WW
+        return datetime.fromisocalendar(int(m.group(3)), int(m.group(4)), 1).replace(tzinfo=timezone.utc)
+    ymd = m.group(5)  # YYYYMMDD
+    return datetime(int(ymd[:4]), int(ymd[4:6]), int(ymd[6:]), tzinfo=timezone.utc)
@@ -2,11 +2,11 @@
 # src/commands/draw.py  (W and D)
 # ===============================
 import random
-import os, csv
+import os, csv, re, sys
 import discord
 from discord import app_commands
 from datetime import datetime, timedelta, timezone, time, date
-from ..config import ROLE_ADMIN, ROLE_OFFICIAL, THRESHOLD
+from ..config import THRESHOLD
 from ..utils.date_utils import (
     now_utc,
     to_game_date,
@@ -15,23 +15,33 @@ from ..utils.date_utils import (
     is_game_mon_to_fri,
     game_week_monfri,
 )
-from ..utils.csv_utils import append_sorteo
-from ..storage import weekly_summary, get_train_config
+from ..utils.csv_utils import append_sorteo, append_sorteos_bulk, week_csv_names, CSV_BUFFER_SIZE
+from ..storage import weekly_summary, get_train_config, get_train_config_version
+from ..utils.auth import has_role
 
 UTC = timezone.utc
 
 
-def has_role(member: discord.Member) -> bool:
-    names = {r.name for r in getattr(member, "roles", [])}
-    return any(r in names for r in ROLE_ADMIN + ROLE_OFFICIAL)
+# ---------- helper: exclude drivers from pool ----------
+# Conjunto de drivers (minúsculas) memoizado por versión de la config de train
+_DRIVERS_CACHE = {"v": None, "set": frozenset()}
 
+def _train_drivers_lower() -> frozenset[str]:
+    v = get_train_config_version()
+    c = _DRIVERS_CACHE
+    if c["v"] != v:
+        c["set"] = frozenset(d.lower() for d in get_train_config().get("drivers", []) if d and d.strip())
+        c["v"] = v
+    return c["set"]
 
-# ---------- helper: exclude drivers from pool ----------
 def _exclude_train_drivers(pool: list[str]) -> list[str]:
-    train_cfg = get_train_config()
-    drivers = {d.lower() for d in train_cfg.get("drivers", []) if d and d.strip()}
+    drivers = _train_drivers_lower()
     return [p for p in pool if p.lower() not in drivers]
 
+def _filter_pool(pool: list[str], drivers_lc: frozenset[str], excl_prev: frozenset[str]) -> list[str]:
+    # Quita drivers de train (comparación en minúsculas) y pasajeros excluidos en una sola pasada
+    return [n for n in pool if n.lower() not in drivers_lc and n not in excl_prev]
+
 
 @app_commands.command(name="draw", description="Alliance draws: D (daily) or W (weekly)")
 @app_commands.describe(kind="D = daily (uses previous game-day), W = weekly (after event ends)")
@@ -48,40 +58,61 @@ async def draw(interaction: discord.Interaction, kind: app_commands.Choice[str])
     else:
         return await draw_w(interaction)
 
-def _parse_pipe_kv(detail: str) -> dict[str, str]:
-    # "W|for:YYYYMMDD|passenger:Foo Bar|backups:A,B" -> {"for":"...","passenger":"...","backups":"A,B"}
-    s = detail or ""
-    if "|" in s and (s.startswith("W|") or s.startswith("D|") or s.startswith("weekend|")):
-        s = s.split("|", 1)[1]
-    out = {}
-    for part in s.split("|"):
-        if ":" in part:
-            k, v = part.split(":", 1)
+def _parse_pipe_kv(detail: bytes) -> dict[bytes, bytes]:
+    # b"W|for:YYYYMMDD|passenger:Foo Bar|backups:A,B" -> {b"for":b"...",b"passenger":b"...",b"backups":b"A,B"}
+    # Mismas reglas que el parser de texto original: partes por '|', clave antes del primer ':' (strip + lower)
+    s = detail or b""
+    if b"|" in s and s.startswith((b"W|", b"D|", b"weekend|")):
+        s = s.split(b"|", 1)[1]
+    out: dict[bytes, bytes] = {}
+    for part in s.split(b"|"):
+        k, sep, v = part.partition(b":")
+        if sep:
             out[k.strip().lower()] = v.strip()
     return out
 
+def _csv_detalle_bytes(rest: bytes) -> bytes:
+    # Último campo de una línea del CSV de sorteos (ver csv_utils._escape_csv): quitar comillas si aplica
+    rest = rest.strip()
+    if rest.startswith(b'"') and rest.endswith(b'"') and len(rest) >= 2:
+        return rest[1:-1].replace(b'""', b'"')
+    return rest
+
 def _exclude_last_week_W_passengers(target_week_monday_real: date) -> set[str]:
     """
     Lee el CSV de la semana inmediatamente anterior (el del domingo previo)
     y devuelve los nombres que salieron como passenger en líneas tipo 'W'.
     """
-    from datetime import datetime, timezone, timedelta
-    from ..utils.csv_utils import week_csv_names
-    UTC = timezone.utc
-
     prev_sunday_real = target_week_monday_real - timedelta(days=1)  # domingo anterior
     csv_path = week_csv_names(datetime(prev_sunday_real.year, prev_sunday_real.month, prev_sunday_real.day, tzinfo=UTC))["sorteos"]
     out: set[str] = set()
     if not csv_path or not os.path.exists(csv_path):
         return out
     try:
-        with open(csv_path, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if (row.get("tipo") or "").strip().upper() != "W":
+        # Columnas fijas: fecha,semana,tipo,detalle (solo 'detalle' puede ir entre comillas)
+        decoded: dict[bytes, str] = {}
+        with open(csv_path, "rb", buffering=CSV_BUFFER_SIZE) as f:
+            next(f, None)  # header
+            for line in f:
+                # Tipo W sin importar mayúsculas/espacios (como el parser original)
+                parts = line.split(b",", 3)
+                if len(parts) < 4 or parts[2].strip().upper() != b"W":
                     continue
-                kv = _parse_pipe_kv(row.get("detalle") or "")
-                p = (kv.get("passenger") or "").strip()
+                det = parts[3].strip()
+                raw = None
+                # Camino rápido solo sobre 'detalle' sin comillas y con una única clave exacta
+                # "|passenger:" (p. ej. tras "W|"); si no, parse completo de las partes
+                if not det.startswith(b'"') and det.count(b"passenger") == 1:
+                    i = det.find(b"|passenger:")
+                    if i >= 0:
+                        i += len(b"|passenger:")
+                        j = det.find(b"|", i)
+                        raw = (det[i:] if j < 0 else det[i:j]).strip()
+                if raw is None:
+                    raw = _parse_pipe_kv(_csv_detalle_bytes(det)).get(b"passenger", b"")
+                p = decoded.get(raw)
+                if p is None:
+                    p = decoded[raw] = sys.intern(raw.decode("utf-8").strip())
                 if p:
                     out.add(p)
     except Exception:
@@ -104,7 +135,7 @@ async def draw_d(interaction: discord.Interaction):
     summary = weekly_summary()
 
     day_key = yyyymmdd_from_date(base_gd)
-    eligibles = list(set(summary.get("eligibles_by_day", {}).get(day_key, [])))
+    eligibles = list({*summary.get("eligibles_by_day", {}).get(day_key, [])})
 
     # 🚫 excluir nombres de train
     eligibles = _exclude_train_drivers(eligibles)
@@ -117,9 +148,8 @@ async def draw_d(interaction: discord.Interaction):
     else:
         applies_for_gd = base_gd + timedelta(days=1)  # next day
 
-    random.shuffle(eligibles)
-    passenger = eligibles[0]
-    backups = eligibles[1:3]
+    picks = random.sample(eligibles, min(3, len(eligibles)))
+    passenger, *backups = picks
 
     detail = f"D|for:{yyyymmdd_from_date(applies_for_gd)}|passenger:{passenger}|backups:{','.join(backups)}"
 
@@ -162,40 +192,36 @@ async def draw_w(interaction: discord.Interaction):
 
     # Obtener resumen de la semana de referencia
     summary = weekly_summary(ref_gd_for_summary)
-    pool = [name for name, avg in summary.get("averages", {}).items() if avg >= THRESHOLD]
-
-    # 🚫 excluir nombres de train
-    pool = _exclude_train_drivers(pool)
-
-    if len(pool) < 5:
-        return await interaction.response.send_message("Not enough average-eligibles (≥ 7.2M) to assign 5 passengers.")
+    eligible = [name for name, avg in summary.get("averages", {}).items() if avg >= THRESHOLD]
 
     # Días destino (Lun–Vie)
     next_week_days = game_week_monfri(target_week_start)
 
-    # 🚫 excluir PASAJEROS que ya salieron en el W de la semana anterior
+    # 🚫 excluir nombres de train y PASAJEROS que ya salieron en el W de la semana anterior (una sola pasada)
+    drivers_lc = _train_drivers_lower()
     target_week_monday_real = target_week_start  # ya es real-world Monday para la semana destino
-    exclude_prev_w = _exclude_last_week_W_passengers(target_week_monday_real)
-    pool = [n for n in pool if n not in exclude_prev_w]
+    exclude_prev_w = frozenset(_exclude_last_week_W_passengers(target_week_monday_real))
+    pool = _filter_pool(eligible, drivers_lc, exclude_prev_w)
 
     if len(pool) < 5:
+        if len(_filter_pool(eligible, drivers_lc, frozenset())) < 5:
+            return await interaction.response.send_message("Not enough average-eligibles (≥ 7.2M) to assign 5 passengers.")
         return await interaction.response.send_message(
             "Not enough average-eligibles after excluding last week's W passengers (need 5)."
         )
 
-    random.shuffle(pool)
+    # Una sola muestra: los 5 primeros son pasajeros, el resto (hasta 10) backups de a 2 por día
+    chosen = random.sample(pool, min(len(pool), 15))
     picks = []
-    available = pool[:]
     for i in range(5):
-        passenger = available.pop(0)
-        backups = []
-        if available: backups.append(available.pop(0))
-        if available: backups.append(available.pop(0))
+        passenger = chosen[i]
+        backups = chosen[5 + 2 * i:7 + 2 * i]
         picks.append({"day": next_week_days[i], "passenger": passenger, "backups": backups})
 
-    for p in picks:
-        detail = f"W|for:{p['day'].strftime('%Y%m%d')}|passenger:{p['passenger']}|backups:{','.join(p['backups'])}"
-        append_sorteo(now_dt, "W", detail)
+    append_sorteos_bulk(now_dt, "W", [
+        f"W|for:{p['day'].strftime('%Y%m%d')}|passenger:{p['passenger']}|backups:{','.join(p['backups'])}"
+        for p in picks
+    ])
 
     lines = "\n".join(
         f"• {p['day'].strftime('%A %d/%m')}: passenger **{p['passenger']}**, backups {', '.join(f'**{b}**' for b in p['backups'])}"
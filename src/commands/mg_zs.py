@@ -4,177 +4,170 @@
 # /mg and /zs scheduling (optional weekend HHmm) + /mg_status and /zs_status
 # Repeats: MG every 2 days, ZS every 3 days. Server clock = UTC-2 (00:00 server == 02:00 UTC)
 from __future__ import annotations
-import math
-from datetime import datetime, timedelta, timezone, time as dtime
+from datetime import date, datetime, timedelta, timezone, time as dtime
+from functools import lru_cache
 import discord
 from discord import app_commands
-from ..config import ROLE_ADMIN, ROLE_OFFICIAL
-from ..storage import set_schedule, get_schedule
+from ..storage import set_schedule, get_schedule, get_state_version
+from ..utils.auth import require_role
 
 UTC = timezone.utc
-
-# ---------- Roles (local, NOT centralized) ----------
-def _to_role_list(v) -> list[str]:
-    # Accept string ("R5,R4") or list from config
-    if isinstance(v, (list, tuple)):
-        return [str(x).strip() for x in v if str(x).strip()]
-    if isinstance(v, str):
-        return [s.strip() for s in v.split(",") if s.strip()]
-    return []
-
-def has_role(member: discord.Member) -> bool:
-    names = {r.name for r in getattr(member, "roles", [])}
-    allow = set(_to_role_list(ROLE_ADMIN) + _to_role_list(ROLE_OFFICIAL))
-    return any(n in allow for n in names)
+# Server clock = UTC-2
+_SERVER_OFFSET = timedelta(hours=2)
 
 # ---------- Helpers ----------
+@lru_cache(maxsize=128)
 def _parse_hhmm(hhmm: str) -> dtime | None:
+    # "930"/"0930"/"2330": 3-4 dígitos ASCII → HHMM
     s = (hhmm or "").strip()
-    if len(s) not in (3, 4) or not s.isdigit():
+    if len(s) not in (3, 4) or not (s.isascii() and s.isdigit()):
         return None
-    s = s.zfill(4)
-    hh, mm = int(s[:2]), int(s[2:])
-    if 0 <= hh < 24 and 0 <= mm < 60:
+    hh, mm = divmod(int(s), 100)
+    if hh < 24 and mm < 60:
         return dtime(hour=hh, minute=mm)
     return None
 
+def _parse_yyyymmdd(s: str) -> date | None:
+    # 8 dígitos ASCII; date() valida mes/día (sin strptime)
+    s = (s or "").strip()
+    if len(s) != 8 or not (s.isascii() and s.isdigit()):
+        return None
+    try:
+        return date(int(s[:4]), int(s[4:6]), int(s[6:]))
+    except ValueError:
+        return None
+
 def _server_now_utc() -> datetime:
     # Now in UTC; server clock is UTC-2
     return datetime.now(UTC)
 
 def _server_dt_to_utc(dt_server: datetime) -> datetime:
-    return dt_server + timedelta(hours=2)
+    return dt_server + _SERVER_OFFSET
 
 def _utc_to_server_dt(dt_utc: datetime) -> datetime:
-    return dt_utc - timedelta(hours=2)
+    return dt_utc - _SERVER_OFFSET
 
-def _weekday_is_weekend(dt_server_date: datetime) -> bool:
-    # Saturday=5, Sunday=6 (isoweekday: Mon=1..Sun=7)
-    wd = dt_server_date.isoweekday()
-    return wd in (6, 7)  # Sat(6), Sun(7)
+def _weekday_is_weekend(d: date) -> bool:
+    # isoweekday: Mon=1..Sun=7 → Sat(6), Sun(7)
+    return d.isoweekday() >= 6
 
 def _format_server(dt_utc: datetime) -> str:
     # Show YYYY-MM-DD HH:MM in server clock
-    sv = _utc_to_server_dt(dt_utc)
+    sv = dt_utc - _SERVER_OFFSET
     return sv.strftime("%Y-%m-%d %H:%M (server)")
 
-def _maybe_avoid_overlap_with_mg(candidate_utc: datetime,
-                                 base_date,
-                                 is_weekend: bool) -> tuple[datetime, bool]:
-    mg_cfg = get_schedule("MG")
-    if not mg_cfg:
-        return candidate_utc, False
+# Config parseada por kind: {kind: (version, parsed)}; parsed = None si no hay schedule válido,
+# o (first_server_date, t_weekday, t_weekend, weekend_hhmm_set, repeat_days)
+_SCHED_CACHE: dict[str, tuple] = {}
 
-    try:
-        mg_first_utc = datetime.fromisoformat(mg_cfg["first_utc"]).replace(tzinfo=UTC)
-    except Exception:
-        return candidate_utc, False
+def _parsed_schedule(kind: str) -> tuple | None:
+    version = get_state_version()
+    hit = _SCHED_CACHE.get(kind)
+    if hit is not None and hit[0] == version:
+        return hit[1]
 
-    mg_repeat = int(mg_cfg.get("repeat_days") or 0)
-    if mg_repeat <= 0:
-        return candidate_utc, False
+    parsed = None
+    cfg = get_schedule(kind)
+    if cfg:
+        first_utc_iso = cfg.get("first_utc")
+        repeat_days = int(cfg.get("repeat_days") or 0)
+        try:
+            first_utc = datetime.fromisoformat(first_utc_iso).replace(tzinfo=UTC) if first_utc_iso else None
+        except Exception:
+            first_utc = None
+        if first_utc is not None and repeat_days > 0:
+            weekend_hhmm = cfg.get("weekend_hhmm") or None
+            parsed = (
+                _utc_to_server_dt(first_utc).date(),
+                _parse_hhmm(cfg.get("hhmm_server") or ""),
+                _parse_hhmm(weekend_hhmm) if weekend_hhmm else None,
+                bool(weekend_hhmm),
+                repeat_days,
+            )
+
+    _SCHED_CACHE[kind] = (version, parsed)
+    return parsed
+
+def _candidate_utc(base_date: date, t: dtime) -> datetime:
+    # fecha+hora en reloj server (tzinfo UTC emulado) → UTC real
+    return datetime.combine(base_date, t, tzinfo=UTC) + _SERVER_OFFSET
+
+def _mg_time_on(mg: tuple | None, base_date: date, is_weekend: bool) -> dtime | None:
+    """Hora (server) de MG en base_date, o None si ese día no hay MG.
+    mg: _parsed_schedule("MG"), resuelto una vez por el llamador; la hora solo se elige
+    cuando la aritmética modular confirma que el día coincide."""
+    if not mg:
+        return None
+    mg_first_date, mg_t_weekday, mg_t_weekend, mg_has_weekend, mg_repeat = mg
 
-    mg_first_server = _utc_to_server_dt(mg_first_utc)
-    delta_days = (base_date - mg_first_server.date()).days
+    delta_days = (base_date - mg_first_date).days
     if delta_days < 0 or (delta_days % mg_repeat) != 0:
-        return candidate_utc, False
-
-    mg_hhmm = mg_cfg.get("weekend_hhmm") if (is_weekend and mg_cfg.get("weekend_hhmm")) else mg_cfg.get("hhmm_server")
-    t_mg = _parse_hhmm(mg_hhmm or "")
-    if not t_mg:
-        return candidate_utc, False
-
-    mg_server_dt = datetime.combine(base_date, t_mg, tzinfo=UTC)
-    mg_utc_dt = _server_dt_to_utc(mg_server_dt)
-
-    if mg_utc_dt == candidate_utc:
-        return candidate_utc + timedelta(minutes=30), True
+        return None
 
-    return candidate_utc, False
+    return mg_t_weekend if (is_weekend and mg_has_weekend) else mg_t_weekday
 
 def _next_occurrences(kind: str, count: int = 3) -> list[tuple[datetime, str]]:
     """
     Returns up to `count` upcoming occurrences for schedule `kind` ('MG'|'ZS').
     Each item: (occurrence_utc, note) with note indicating if weekend hour applied.
     """
-    cfg = get_schedule(kind)
-    if not cfg:
-        return []
-    first_utc_iso = cfg.get("first_utc")
-    hhmm_server = cfg.get("hhmm_server") or ""
-    weekend_hhmm = cfg.get("weekend_hhmm") or None
-    repeat_days = int(cfg.get("repeat_days") or 0)
-    if not first_utc_iso or repeat_days <= 0:
+    parsed = _parsed_schedule(kind)
+    if not parsed:
         return []
+    first_date, t_weekday, t_weekend, has_weekend, repeat_days = parsed
+    # Para ZS, la config de MG se resuelve una sola vez (anti-solape)
+    mg = _parsed_schedule("MG") if kind == "ZS" else None
 
-    try:
-        first_utc = datetime.fromisoformat(first_utc_iso).replace(tzinfo=UTC)
-    except Exception:
-        return []
-
-    # Convert first occurrence to server clock (baseline date)
-    first_server = _utc_to_server_dt(first_utc)
     # We step by repeat_days on the DATE in server clock, choosing the hour per weekday
     now_utc = _server_now_utc()
-    now_server = _utc_to_server_dt(now_utc)
+    now_server = now_utc - _SERVER_OFFSET
 
-    # Find k0 = smallest k such that candidate >= now (in server clock)
-    # Start by estimating days since first date
-    if now_server.date() <= first_server.date():
-        k = 0
-    else:
-        diff_days = (now_server.date() - first_server.date()).days
-        k = max(0, math.floor(diff_days / repeat_days))
+    # k0 = primer k cuya fecha (server) no es anterior a hoy: ceil(días desde la primera / repeat_days).
+    # Solo ese primer candidato puede quedar en el pasado (misma fecha, hora ya pasada); los siguientes son futuros.
+    days_ahead = (now_server.date() - first_date).days
+    k = max(0, -(-days_ahead // repeat_days))
 
     out: list[tuple[datetime, str]] = []
-    tried = 0
-    # Safety cap
-    while len(out) < count and tried < 365:
-        tried += 1
-        base_date = first_server.date() + timedelta(days=k * repeat_days)
+    while len(out) < count:
+        base_date = first_date + timedelta(days=k * repeat_days)
+        k += 1
         # Choose hour for this base_date (server)
-        is_weekend = _weekday_is_weekend(datetime.combine(base_date, dtime(0, 0), tzinfo=UTC))
-        use_hhmm = weekend_hhmm if (is_weekend and weekend_hhmm) else hhmm_server
-        t = _parse_hhmm(use_hhmm)
+        is_weekend = _weekday_is_weekend(base_date)
+        t = t_weekend if (is_weekend and has_weekend) else t_weekday
         if not t:
             # if invalid time config, stop
             break
-        candidate_server = datetime.combine(base_date, t, tzinfo=UTC)  # server tz emulated (UTC tzinfo, but values are in server clock)
-        candidate_utc = _server_dt_to_utc(candidate_server)
+        candidate_utc = _candidate_utc(base_date, t)
 
-        # ✅ Ajuste anti-solape: solo para ZS
+        # ✅ Ajuste anti-solape: solo para ZS (misma fecha → basta comparar la hora server)
         note_extra = ""
-        if kind == "ZS":
-            candidate_utc, adjusted = _maybe_avoid_overlap_with_mg(candidate_utc, base_date, is_weekend)
-            if adjusted:
-                note_extra = " (After MG)"
+        if mg is not None and _mg_time_on(mg, base_date, is_weekend) == t:
+            candidate_utc += timedelta(minutes=30)
+            note_extra = " (After MG)"
 
         if candidate_utc >= now_utc:
-            note = "Special hour" if (is_weekend and weekend_hhmm) else "Regular hour"
+            note = "Special hour" if (is_weekend and has_weekend) else "Regular hour"
             out.append((candidate_utc, note + note_extra))
 
-        k += 1
-
     return out
 
 # ---------- Commands ----------
 @app_commands.command(name="mg", description="Schedule MG: /mg <yyyymmdd> <hhmm> [<hhmm_weekend>] (server); repeats every 2 days")
 @app_commands.describe(date_yyyymmdd="YYYYMMDD (server date)", time_hhmm="HHmm (server time)", weekend_hhmm="HHmm for Sat/Sun if different")
+@require_role
 async def mg(interaction: discord.Interaction, date_yyyymmdd: str, time_hhmm: str, weekend_hhmm: str | None = None):
-    if not isinstance(interaction.user, discord.Member) or not has_role(interaction.user):
-        return await interaction.response.send_message("No permission.", ephemeral=True)
-
     # Parse date/time (server → UTC + 2h)
-    try:
-        dt_server = datetime.strptime(date_yyyymmdd + time_hhmm, "%Y%m%d%H%M").replace(tzinfo=UTC)
-    except Exception:
+    d_server = _parse_yyyymmdd(date_yyyymmdd)
+    if d_server is None:
         return await interaction.response.send_message("Invalid format. Use /mg <yyyymmdd> <hhmm> [<hhmm_weekend>]", ephemeral=True)
 
-    if not _parse_hhmm(time_hhmm):
+    t_server = _parse_hhmm(time_hhmm)
+    if not t_server:
         return await interaction.response.send_message("Invalid HHmm for weekday.", ephemeral=True)
     if weekend_hhmm and not _parse_hhmm(weekend_hhmm):
         return await interaction.response.send_message("Invalid HHmm for weekend.", ephemeral=True)
 
+    dt_server = datetime.combine(d_server, t_server, tzinfo=UTC)
     first_utc = _server_dt_to_utc(dt_server)
     set_schedule("MG", first_utc.isoformat(), time_hhmm, 2, weekend_hhmm)
     tail = f" (weekend {weekend_hhmm})" if weekend_hhmm else ""
@@ -184,20 +177,19 @@ async def mg(interaction: discord.Interaction, date_yyyymmdd: str, time_hhmm: st
 
 @app_commands.command(name="zs", description="Schedule ZS: /zs <yyyymmdd> <hhmm> [<hhmm_weekend>] (server); repeats every 3 days")
 @app_commands.describe(date_yyyymmdd="YYYYMMDD (server date)", time_hhmm="HHmm (server time)", weekend_hhmm="HHmm for Sat/Sun if different")
+@require_role
 async def zs(interaction: discord.Interaction, date_yyyymmdd: str, time_hhmm: str, weekend_hhmm: str | None = None):
-    if not isinstance(interaction.user, discord.Member) or not has_role(interaction.user):
-        return await interaction.response.send_message("No permission.", ephemeral=True)
-
-    try:
-        dt_server = datetime.strptime(date_yyyymmdd + time_hhmm, "%Y%m%d%H%M").replace(tzinfo=UTC)
-    except Exception:
+    d_server = _parse_yyyymmdd(date_yyyymmdd)
+    if d_server is None:
         return await interaction.response.send_message("Invalid format. Use /zs <yyyymmdd> <hhmm> [<hhmm_weekend>]", ephemeral=True)
 
-    if not _parse_hhmm(time_hhmm):
+    t_server = _parse_hhmm(time_hhmm)
+    if not t_server:
         return await interaction.response.send_message("Invalid HHmm for weekday.", ephemeral=True)
     if weekend_hhmm and not _parse_hhmm(weekend_hhmm):
         return await interaction.response.send_message("Invalid HHmm for weekend.", ephemeral=True)
 
+    dt_server = datetime.combine(d_server, t_server, tzinfo=UTC)
     first_utc = _server_dt_to_utc(dt_server)
     set_schedule("ZS", first_utc.isoformat(), time_hhmm, 3, weekend_hhmm)
     tail = f" (weekend {weekend_hhmm})" if weekend_hhmm else ""
@@ -226,15 +218,13 @@ def _format_status(kind: str) -> str:
     return "\n".join(lines)
 
 @app_commands.command(name="mg_status", description="Show upcoming MG occurrences and config")
+@require_role
 async def mg_status(interaction: discord.Interaction):
-    if not isinstance(interaction.user, discord.Member) or not has_role(interaction.user):
-        return await interaction.response.send_message("No permission.", ephemeral=True)
     msg = "📅 **MG Status**\n" + _format_status("MG")
     await interaction.response.send_message(msg, ephemeral=True)
 
 @app_commands.command(name="zs_status", description="Show upcoming ZS occurrences and config")
+@require_role
 async def zs_status(interaction: discord.Interaction):
-    if not isinstance(interaction.user, discord.Member) or not has_role(interaction.user):
-        return await interaction.response.send_message("No permission.", ephemeral=True)
     msg = "📅 **ZS Status**\n" + _format_status("ZS")
     await interaction.response.send_message(msg, ephemeral=True)
@@ -5,6 +5,8 @@ import discord
 from discord import app_commands
 import logging
 from datetime import date, datetime, timedelta
+from types import MappingProxyType
+from typing import Mapping
 
 from ..utils.date_utils import (
     now_utc,
@@ -16,7 +18,26 @@ from ..storage import register_points
 
 logger = logging.getLogger(__name__)
 
-_DAY_KEY_FROM_WEEKDAY = {0: "mon", 1: "tue", 2: "wed", 3: "thu", 4: "fri", 5: "sat"}
+# Indexado por date.weekday() (0=Mon ... 6=Sun); Sunday nunca se usa (no es día de VS)
+_DAY_KEY = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+# Día aceptado en /points → isoweekday (1..6); solo lectura
+_ABBR_TO_IDX: Mapping[str, int] = MappingProxyType({
+    # en inglés porque tus slash commands están en inglés
+    "mon": 1, "monday": 1,
+    "tue": 2, "tuesday": 2,
+    "wed": 3, "wednesday": 3,
+    "thu": 4, "thursday": 4,
+    "fri": 5, "friday": 5,
+    "sat": 6, "saturday": 6,
+    # soporta español por conveniencia
+    "lun": 1, "lunes": 1,
+    "mar": 2, "martes": 2,
+    "mie": 3, "mié": 3, "miercoles": 3, "miércoles": 3,
+    "jue": 4, "jueves": 4,
+    "vie": 5, "viernes": 5,
+    "sab": 6, "sáb": 6, "sabado": 6, "sábado": 6,
+})
 
 @app_commands.command(name="points", description="Register VS points for the current ISO week (game-day model)")
 @app_commands.describe(name="In-game player name", amount="Points (integer)", day="Optional: mon|tue|wed|thu|fri|sat")
@@ -46,29 +67,12 @@ async def points(interaction: discord.Interaction, name: str, amount: int, day:
                 target_gd = target_gd - timedelta(days=1)  # Saturday
         else:
             # Normalizar entrada de día
-            key = (day or "").strip().lower()
-            _abbr_to_idx = {
-                # en inglés porque tus slash commands están en inglés
-                "mon": 1, "monday": 1,
-                "tue": 2, "tuesday": 2,
-                "wed": 3, "wednesday": 3,
-                "thu": 4, "thursday": 4,
-                "fri": 5, "friday": 5,
-                "sat": 6, "saturday": 6,
-                # soporta español por conveniencia
-                "lun": 1, "lunes": 1,
-                "mar": 2, "martes": 2,
-                "mie": 3, "mié": 3, "miercoles": 3, "miércoles": 3,
-                "jue": 4, "jueves": 4,
-                "vie": 5, "viernes": 5,
-                "sab": 6, "sáb": 6, "sabado": 6, "sábado": 6,
-            }
-            if key not in _abbr_to_idx:
+            desired_idx = _ABBR_TO_IDX.get(day.strip().lower())  # 1..6
+            if desired_idx is None:
                 return await interaction.response.send_message(
                     "Invalid day. Use: mon, tue, wed, thu, fri, sat.", ephemeral=True
                 )
 
-            desired_idx = _abbr_to_idx[key]  # 1..6
             # Monday de la semana ACTUAL (que contiene current_gd)
             monday_gd = current_gd - timedelta(days=(current_wd - 1))  # siempre Monday
 
@@ -105,7 +109,7 @@ async def points(interaction: discord.Interaction, name: str, amount: int, day:
             return await interaction.response.send_message(
                 "VS runs **Mon–Sat**; Sunday is not a valid VS day.", ephemeral=True
             )
-        day_key = _DAY_KEY_FROM_WEEKDAY[weekday_py]  # 'mon'..'sat'
+        day_key = _DAY_KEY[weekday_py]  # 'mon'..'sat'
 
         # Llamada a storage.register_points:
         #  - Usamos 'day=day_key' y además pasamos 'ref_date=target_gd' para que escriba
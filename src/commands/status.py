@@ -1,25 +1,35 @@
 # ===============================
 # src/commands/status.py
 # ===============================
+from operator import itemgetter
 import discord
 from discord import app_commands
 from ..storage import weekly_summary
 from ..utils.date_utils import now_utc
 
+_BY_VALUE = itemgetter(1)
 
-@app_commands.command(name="status_vs", description="Show daily and weekly summary for the current ISO week (UTC/game-day)")
-async def status(interaction: discord.Interaction):
-    s = weekly_summary()
-    per_day = s.get("perDay", {})
+
+def _render_status(s: dict) -> str:
+    days = s.get("days", {})
+    eligibles_by_day = s.get("eligibles_by_day", {})
     averages = s.get("averages", {})
+    # Claves YYYYMMDD: el orden natural de las tuplas ya es cronológico
     days_lines = "\n".join(
-        f"• {d}: total {v['total']:,} | eligibles ({len(v['eligible'])}): {', '.join(v['eligible'])}"
-        for d, v in sorted(per_day.items(), key=lambda x: x[0])
+        f"• {d}: total {sum(map(int, entries.values())):,} | "
+        f"eligibles ({len(eligibles_by_day.get(d, ()))}): {', '.join(eligibles_by_day.get(d, ()))}"
+        for d, entries in sorted(days.items())
     ) or "—"
+    days_count = s.get("days_count", {})
+    hit_days = s.get("hit_days", {})
     avg_lines = "\n".join(
-        f"• {n}: avg {v['average']:,} ({v['daysCount']} days, ≥7.2M on {v['hitDays']})"
-        for n, v in sorted(averages.items(), key=lambda x: x[1]['average'], reverse=True)
+        f"• {n}: avg {round(avg):,} ({days_count.get(n, 0)} days, ≥7.2M on {hit_days.get(n, 0)})"
+        for n, avg in sorted(averages.items(), key=_BY_VALUE, reverse=True)
     ) or "—"
-    await interaction.response.send_message(
-        f"📊 **Status week {s['week']}**\n**By day:**\n{days_lines}\n\n**Averages Mon–Sat:**\n{avg_lines}"
-    )
+    return f"📊 **Status week {s['week']}**\n**By day:**\n{days_lines}\n\n**Averages Mon–Sat:**\n{avg_lines}"
+
+
+@app_commands.command(name="status_vs", description="Show daily and weekly summary for the current ISO week (UTC/game-day)")
+async def status(interaction: discord.Interaction):
+    # weekly_summary ya está memorizado por semana/versión del estado
+    await interaction.response.send_message(_render_status(weekly_summary()))
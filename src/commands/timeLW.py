@@ -4,6 +4,10 @@
 # src/commands/timelw.py — show current game/server time and convert server-time to all TZs in a country
 from __future__ import annotations
 import unicodedata
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Sequence
+from functools import lru_cache
 from datetime import datetime, timedelta, timezone
 import discord
 from discord import app_commands
@@ -13,19 +17,62 @@ import pycountry
 from ..utils.date_utils import now_utc, to_game_date, yyyymmdd_from_date
 
 UTC = timezone.utc
+# Server clock = UTC-2 (00:00 server == 02:00 UTC)
+_SERVER_OFFSET = timedelta(hours=2)
+
+
+class _StripMarks(dict):
+    # Tabla para str.translate: marcas no espaciadas (Mn) → None (se borran), el resto igual.
+    # Se llena sola con cada código nuevo, así que no hay que recorrer todo Unicode al importar.
+    def __missing__(self, cp: int):
+        v = None if unicodedata.category(chr(cp)) == 'Mn' else cp
+        self[cp] = v
+        return v
+
+
+_STRIP_MARKS = _StripMarks()
 
 
 def _strip_accents(s: str) -> str:
-    return ''.join(c for c in unicodedata.normalize('NFD', s) if unicodedata.category(c) != 'Mn')
+    if s.isascii():
+        return s
+    return unicodedata.normalize('NFD', s).translate(_STRIP_MARKS)
+
+
+def _build_country_index() -> dict[str, str]:
+    # nombre sin acentos en minúsculas → alpha_2; la tabla de pycountry es estática.
+    # setdefault: ante nombres repetidos gana el primer país, como en el recorrido original.
+    index: dict[str, str] = {}
+    for c in pycountry.countries:
+        for attr in ("name", "common_name", "official_name"):
+            nm = getattr(c, attr, None)
+            if nm:
+                index.setdefault(_strip_accents(nm).lower(), c.alpha_2)
+    return index
+
+
+_COUNTRY_INDEX = _build_country_index()
 
 
 def _country_to_alpha2(country_input: str) -> str | None:
     if not country_input:
         return None
-    s = country_input.strip()
+    # lookup/search_fuzzy de pycountry ya ignoran mayúsculas: la clave de caché va normalizada
+    return _country_to_alpha2_cached(country_input.strip().lower())
+
+
+@lru_cache(maxsize=1024)
+def _country_to_alpha2_cached(s: str) -> str | None:
     # Direct 2-letter code
     if len(s) == 2:
         return s.upper()
+    # Entrada ASCII (lo habitual: "mexico", "united states"): ya es la clave del índice,
+    # sin normalizar ni pasar por lookup (que lanza excepción en cada fallo)
+    ascii_in = s.isascii()
+    if ascii_in and len(s) > 3:
+        hit = _COUNTRY_INDEX.get(s)
+        if hit:
+            return hit
     # Try exact / fuzzy with pycountry
     try:
         c = pycountry.countries.lookup(s)
@@ -33,12 +80,10 @@ def _country_to_alpha2(country_input: str) -> str | None:
     except Exception:
         pass
     # Try without accents, case-insensitive
-    s2 = _strip_accents(s).lower()
-    for c in pycountry.countries:
-        names = [c.name] + [a.common_name for a in [c] if hasattr(c, 'common_name')] + list(getattr(c, 'official_name', '') and [c.official_name] or [])
-        for nm in names:
-            if _strip_accents(nm).lower() == s2:
-                return c.alpha_2
+    key = s if ascii_in else _strip_accents(s).lower()
+    hit = _COUNTRY_INDEX.get(key)
+    if hit:
+        return hit
     # Fallback: fuzzy search
     try:
         matches = pycountry.countries.search_fuzzy(s)
@@ -49,10 +94,58 @@ def _country_to_alpha2(country_input: str) -> str | None:
     return None
 
 
+@lru_cache(maxsize=1024)
+def _tz(name: str):
+    return pytz.timezone(name)
+
+
 def _format_dt(dt: datetime) -> str:
     return dt.strftime('%Y%m%d %H:%M')
 
 
+@lru_cache(maxsize=128)
+def _zone_lines(alpha2: str, dt_utc: datetime) -> tuple[str, ...]:
+    """Una línea por zona del país en el instante dt_utc, ordenadas por offset y nombre.
+    Memoizado por (país, instante): repetir la misma consulta no vuelve a convertir.
+    La conversión sigue siendo astimezone (fromutc de pytz), que resuelve bien el DST;
+    solo se formatea una vez la hora local por cada offset distinto."""
+    items = []
+    for tzname in pytz.country_timezones.get(alpha2) or ():
+        off = dt_utc.astimezone(_tz(tzname)).utcoffset() or timedelta(0)
+        items.append((int(off.total_seconds()), tzname))
+    items.sort()
+
+    local_txt: dict[int, str] = {}
+    lines = []
+    for off_s, tzname in items:
+        txt = local_txt.get(off_s)
+        if txt is None:
+            txt = local_txt[off_s] = f"{_format_dt(dt_utc + timedelta(seconds=off_s))} ({_format_offset(off_s)})"
+        lines.append(f"• {tzname}: {txt}")
+    return tuple(lines)
+
+
+def _chunk_bounds(lines: Sequence[str], limit: int):
+    # Cortes [a, b) de `lines` cuyo texto unido con "\n" cabe en `limit` (cada línea cuenta len+1).
+    # Tamaños acumulados una vez; cada corte es un bisect. Una línea sola más larga que limit va sola.
+    sizes = list(accumulate(len(line) + 1 for line in lines))
+    a, n = 0, len(lines)
+    while a < n:
+        base = sizes[a - 1] if a else 0
+        b = max(bisect_right(sizes, base + limit, a), a + 1)
+        yield a, b
+        a = b
+
+
+@lru_cache(maxsize=64)
+def _format_offset(seconds: int) -> str:
+    # -18000 → "UTC-05:00"
+    total = seconds // 60
+    sign = '-' if total < 0 else '+'
+    h, m = divmod(abs(total), 60)
+    return f"UTC{sign}{h:02d}:{m:02d}"
+
+
 @app_commands.command(name="time_lw", description="Show server time now or convert a server-date/time to all TZs for a country")
 @app_commands.describe(yyyymmdd="Server date YYYYMMDD", hhmm="Server time HHmm (24h)", country="Country name or ISO-3166 code")
 async def time_lw(interaction: discord.Interaction, yyyymmdd: str | None = None, hhmm: str | None = None, country: str | None = None):
@@ -62,12 +155,12 @@ async def time_lw(interaction: discord.Interaction, yyyymmdd: str | None = None,
         game_date = to_game_date(nowdt)
 
         # Server clock = UTC - 2h (00:00 server == 02:00 UTC)
-        server_now = nowdt - timedelta(hours=2)
+        server_now = nowdt - _SERVER_OFFSET
 
         # Server midnight in *server clock*
         server_midnight_server = server_now.replace(hour=0, minute=0, second=0, microsecond=0)
         # Its equivalent in UTC (solo para claridad)
-        server_day_start_utc = server_midnight_server + timedelta(hours=2)
+        server_day_start_utc = server_midnight_server + _SERVER_OFFSET
 
         msg = (
             "🕒 **Last War Time**\n"
@@ -91,7 +184,7 @@ async def time_lw(interaction: discord.Interaction, yyyymmdd: str | None = None,
         return await interaction.response.send_message("Invalid date/time format.", ephemeral=True)
 
     # Convert from server time to UTC by adding 2 hours
-    dt_utc = (dt_server_naive.replace(tzinfo=UTC) + timedelta(hours=2))
+    dt_utc = (dt_server_naive.replace(tzinfo=UTC) + _SERVER_OFFSET)
 
     # Resolve country to alpha-2
     alpha2 = _country_to_alpha2(country)
@@ -107,42 +200,21 @@ async def time_lw(interaction: discord.Interaction, yyyymmdd: str | None = None,
     if not tz_list:
         return await interaction.response.send_message(f"No time zones found for country `{alpha2}`.", ephemeral=True)
 
-    # Build per-timezone local times
-    items = []
-    for tzname in tz_list:
-        tz = pytz.timezone(tzname)
-        local_dt = dt_utc.astimezone(tz)
-        # Show also UTC offset
-        offset = local_dt.strftime('%z')  # e.g. -0500
-        offset_fmt = f"UTC{offset[:3]}:{offset[3:]}" if offset else "UTC±00:00"
-        items.append((tzname, local_dt, offset_fmt))
-
-    # Sort by offset then tz name
-    items.sort(key=lambda t: (t[1].utcoffset() or timedelta(0), t[0]))
-
     # Render
+    lines = _zone_lines(alpha2, dt_utc)
     header = (
         f"🕒 **Server→Local Time Conversion**\n"
         f"• Input (server): {yyyymmdd} {hhmm[:2]}:{hhmm[2:]}\n"
         f"• Server→UTC (+2h): {dt_utc.strftime('%Y%m%d %H:%M')}\n"
-        f"• Country: {alpha2} — {len(items)} time zone(s)"
+        f"• Country: {alpha2} — {len(lines)} time zone(s)"
     )
-    lines = [f"• {tz}: {_format_dt(ldt)} ({off})" for tz, ldt, off in items]
     text = header + "\n" + "\n".join(lines)
 
     # Discord message size safety: chunk if needed
     if len(text) > 1900:
         await interaction.response.send_message(header, ephemeral=True)
-        chunk = []
-        size = 0
-        for line in lines:
-            if size + len(line) + 1 > 1900:
-                await interaction.followup.send("\n".join(chunk), ephemeral=True)
-                chunk, size = [], 0
-            chunk.append(line)
-            size += len(line) + 1
-        if chunk:
-            await interaction.followup.send("\n".join(chunk), ephemeral=True)
+        for a, b in _chunk_bounds(lines, 1900):
+            await interaction.followup.send("\n".join(lines[a:b]), ephemeral=True)
         return
 
     await interaction.response.send_message(text, ephemeral=True)
@@ -12,36 +12,26 @@
 #  - Si no hay registro weekend, se muestra "Pending"
 #
 from __future__ import annotations
+import re
 import discord
 from discord import app_commands
 from datetime import timedelta, date, datetime, timezone
 from typing import Optional, Tuple, Dict
 
-from ..config import ROLE_ADMIN, ROLE_OFFICIAL
-from ..storage import set_train_config, get_train_config
+from ..storage import set_train_config, get_train_config, get_train_anchor
 from ..utils.date_utils import to_game_date, from_game_date, now_utc
 from ..utils.train_utils import driver_for_day, read_draw_for_date
-from ..utils.csv_utils import week_csv_names
+from ..utils.csv_utils import week_csv_names, iter_sorteos_rows, cached_file_index
+from ..utils.auth import require_role  # Admin/Official pueden editar
 
 UTC = timezone.utc
 
-# --------------------------------
-# permisos (Admin/Official pueden editar)
-# --------------------------------
-def has_role(member: discord.Member) -> bool:
-    names = {r.name for r in getattr(member, "roles", [])}
-    # ROLE_* pueden ser listas o strings separados por coma; manejamos ambos
-    def _to_list(v):
-        if isinstance(v, (list, tuple)): return [str(x).strip() for x in v if str(x).strip()]
-        if isinstance(v, str): return [s.strip() for s in v.split(",") if s.strip()]
-        return []
-    allow = set(_to_list(ROLE_ADMIN) + _to_list(ROLE_OFFICIAL))
-    return any(n in allow for n in names)
-
 # -----------------------------
 # utilidades para /train_show
 # -----------------------------
 _LABELS_EN = ["Mon","Tue","Wed","Thu","Fri","Sat","Sun"]
+# Etiquetas de /train_set_drivers (rotación de 2 semanas)
+_DRIVER_LABELS = ("1Mon","1Tue","1Wed","1Thu","1Fri","2Mon","2Tue","2Wed","2Thu","2Fri")
 
 def _monday_of(d: date) -> date:
     return d - timedelta(days=d.weekday())  # Monday=0
@@ -54,16 +44,22 @@ def _csv_path_for(dt_utc: datetime) -> Optional[str]:
     p = names.get("sorteos")
     return p
 
+# Prefijo de tipo al inicio de "detalle"
+_PREFIX_RE = re.compile(r"(?:weekend|W|D)\|")
+
 def _parse_pipe_kv(detail: str) -> Dict[str, str]:
     # Convierte "weekend|for:YYYYMMDD|driver:...|driver_backup:...|passenger:...|passenger_backups:A,B"
     # a dict {"for": "...", "driver": "...", "driver_backup": "...", "passenger": "...", "passenger_backups": "..."}
     s = detail or ""
-    if s.startswith(("W|", "D|", "weekend|")):
-        s = s.split("|", 1)[1] if "|" in s else ""
+    # Remove leading type prefix if present ("W|", "D|", "weekend|")
+    m = _PREFIX_RE.match(s)
+    if m:
+        s = s[m.end():]
     out: Dict[str, str] = {}
     for part in s.split("|"):
-        if ":" in part:
-            k, v = part.split(":", 1)
+        # partition: un solo corte por parte, sin lista intermedia
+        k, sep, v = part.partition(":")
+        if sep:
             out[k.strip().lower()] = v.strip()
     return out
 
@@ -83,6 +79,29 @@ def _next_sunday_ref(d: date) -> datetime:
 def _this_week_ref(d: date) -> datetime:
     return _utc_from_date(d)
 
+# Índice por CSV semanal (cached_file_index): {(grupo, for_date): kv}, grupo "weekend" o "wd" (W/D).
+# Se reconstruye solo si el archivo cambió; ante filas repetidas gana la primera, como el recorrido original.
+def _build_weekly_index(f) -> Dict[Tuple[str, str], Dict[str, str]]:
+    index: Dict[Tuple[str, str], Dict[str, str]] = {}
+    for tipo, det in iter_sorteos_rows(f):
+        tipo = tipo.strip().lower()
+        if tipo == "weekend":
+            group = "weekend"
+        elif tipo in ("w", "d"):
+            group = "wd"
+        else:
+            continue
+        kv = _parse_pipe_kv(det)
+        index.setdefault((group, kv.get("for")), kv)
+    return index
+
+def _load_weekly_index(path: str) -> Dict[Tuple[str, str], Dict[str, str]]:
+    return cached_file_index(path, _build_weekly_index, {})
+
+def _first_of(csv_names: str) -> Optional[str]:
+    first = (csv_names.split(",")[0] or "").strip() if csv_names else ""
+    return first or None
+
 def _read_weekend_for_date(real_day: date) -> Tuple[Optional[str], Optional[str], Optional[str], Optional[str]]:
     """
     Lee un registro 'weekend' para 'real_day' (sábado o domingo).
@@ -96,28 +115,10 @@ def _read_weekend_for_date(real_day: date) -> Tuple[Optional[str], Optional[str]
         path = _csv_path_for(ref)
         if not path:
             continue
-        if not __import__('os').path.exists(path):
-            continue
-        try:
-            import csv
-            with open(path, "r", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if (row.get("tipo") or "").strip().lower() != "weekend":
-                        continue
-                    kv = _parse_pipe_kv(row.get("detalle") or "")
-                    if kv.get("for") == target:
-                        drv = kv.get("driver")
-                        drv_b = kv.get("driver_backup")
-                        pax = kv.get("passenger")
-                        pax_b1 = None
-                        backs = kv.get("passenger_backups") or ""
-                        if backs:
-                            first = (backs.split(",")[0] or "").strip()
-                            pax_b1 = first or None
-                        return drv or None, drv_b or None, pax or None, pax_b1
-        except Exception:
-            continue
+        kv = _load_weekly_index(path).get(("weekend", target))
+        if kv is not None:
+            return (kv.get("driver") or None, kv.get("driver_backup") or None,
+                    kv.get("passenger") or None, _first_of(kv.get("passenger_backups") or ""))
     return (None, None, None, None)
 
 def _read_weekday_from_csv(real_day: date) -> Tuple[Optional[str], Optional[str]]:
@@ -130,39 +131,42 @@ def _read_weekday_from_csv(real_day: date) -> Tuple[Optional[str], Optional[str]
       3) CSV "de esta semana"                     (compatibilidad adicional)
     Devuelve: (passenger, first_backup) o (None, None).
     """
-    target = real_day.strftime("%Y%m%d")
+    return _weekday_pick(_weekday_index_for_week(real_day).get(real_day.strftime("%Y%m%d")))
+
+def _weekday_index_for_week(real_day: date) -> Dict[str, Dict[str, str]]:
+    """
+    Une las filas W/D de los CSV candidatos de la semana de 'real_day' en {for_date: kv},
+    respetando el orden de búsqueda de _read_weekday_from_csv (el primer CSV que tenga el día gana).
+    Los tres refs dependen solo de la semana, así que sirve para todo Mon–Fri con una sola unión.
+    """
+    combined: Dict[str, Dict[str, str]] = {}
+    seen: set[str] = set()
     for ref in (_next_sunday_ref(real_day), _prev_sunday_ref(real_day), _this_week_ref(real_day)):
         path = _csv_path_for(ref)
-        if not path:
-            continue
-        if not __import__('os').path.exists(path):
+        if not path or path in seen:
             continue
-        try:
-            import csv
-            with open(path, "r", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    tipo = (row.get("tipo") or "").strip().lower()
-                    if tipo not in ("w", "d"):
-                        continue
-                    kv = _parse_pipe_kv(row.get("detalle") or "")
-                    if kv.get("for") == target:
-                        pax = (kv.get("passenger") or "").strip()
-                        backs = (kv.get("backups") or kv.get("passenger_backups") or "").strip()
-                        b1 = None
-                        if backs:
-                            first = (backs.split(",")[0] or "").strip()
-                            b1 = first or None
-                        return pax or None, b1
-        except Exception:
-            continue
-    return (None, None)
+        seen.add(path)
+        for (group, for_date), kv in _load_weekly_index(path).items():
+            if group == "wd":
+                combined.setdefault(for_date, kv)
+    return combined
+
+def _weekday_pick(kv: Optional[Dict[str, str]]) -> Tuple[Optional[str], Optional[str]]:
+    if kv is None:
+        return (None, None)
+    pax = (kv.get("passenger") or "").strip()
+    backs = (kv.get("backups") or kv.get("passenger_backups") or "").strip()
+    return pax or None, _first_of(backs)
+
+_LINE_TMPL = "• {} | Driver = {} — VIP = {}{}".format
+
+def _bold_or_pending(v: str) -> str:
+    return v if v == "Pending" else f"**{v}**"
 
 def _format_day_line(day_real: date, driver: Optional[str], pax: Optional[str], bkp: Optional[str], weekend=False,
                      drv_wk: Optional[str]=None, pax_wk: Optional[str]=None) -> str:
     # driver/pax “Pending” si no hay
-    dlabel = _LABELS_EN[day_real.isoweekday() - 1]
-    dshort = f"{dlabel} {day_real.strftime('%d/%m')}"
+    dshort = f"{_LABELS_EN[day_real.weekday()]} {day_real.day:02d}/{day_real.month:02d}"
     drv_txt = (driver.strip() if driver else "Pending")
     if weekend and drv_wk:
         # si viene de weekend CSV, ya es definitivo
@@ -171,13 +175,15 @@ def _format_day_line(day_real: date, driver: Optional[str], pax: Optional[str],
     if weekend and pax_wk:
         pax_txt = pax_wk.strip() or "Pending"
     bkp_txt = f" (_{bkp}_)" if bkp else ""
-    return f"• {dshort} | Driver = {drv_txt if drv_txt == 'Pending' else f'**{drv_txt}**'} — VIP = {pax_txt if pax_txt == 'Pending' else f'**{pax_txt}**'}{bkp_txt}"
+    return _LINE_TMPL(dshort, _bold_or_pending(drv_txt), _bold_or_pending(pax_txt), bkp_txt)
 
 def _build_week_block(drivers: list[str], anchor_base: date, week_monday_game: date) -> str:
     # Ancla para rotación
     # 'anchor_base' ya viene como date (no ISO); es el mismo para ambos bloques (A/B)
     header = f"**Week starting {from_game_date(week_monday_game).strftime('%Y-%m-%d')}**"
     lines = [header]
+    # Fallback W/D de toda la semana: CSV candidatos unidos una vez, luego un dict lookup por día
+    wd_index = _weekday_index_for_week(from_game_date(week_monday_game))
 
     # Mon..Fri (rotación + pasajeros D/W)
     for i in range(5):
@@ -190,7 +196,7 @@ def _build_week_block(drivers: list[str], anchor_base: date, week_monday_game: d
         pax, bkp = read_draw_for_date(day_real)
         if not pax:
             # Fallback: buscar directamente en CSV considerando Draw W (domingo siguiente)
-            pax, bkp = _read_weekday_from_csv(day_real)
+            pax, bkp = _weekday_pick(wd_index.get(day_real.strftime("%Y%m%d")))
         lines.append(_format_day_line(day_real, drv, pax, bkp))
 
 
@@ -227,28 +233,24 @@ def _build_week_block(drivers: list[str], anchor_base: date, week_monday_game: d
     w1mon="Week1 Monday", w1tue="Week1 Tuesday", w1wed="Week1 Wednesday", w1thu="Week1 Thursday", w1fri="Week1 Friday",
     w2mon="Week2 Monday", w2tue="Week2 Tuesday", w2wed="Week2 Wednesday", w2thu="Week2 Thursday", w2fri="Week2 Friday",
 )
+@require_role
 async def train_set_drivers(
     interaction: discord.Interaction,
     w1mon: str, w1tue: str, w1wed: str, w1thu: str, w1fri: str,
     w2mon: str, w2tue: str, w2wed: str, w2thu: str, w2fri: str,
 ):
-    if not isinstance(interaction.user, discord.Member) or not has_role(interaction.user):
-        return await interaction.response.send_message("No permission.", ephemeral=True)
-
     drivers = [w1mon, w1tue, w1wed, w1thu, w1fri, w2mon, w2tue, w2wed, w2thu, w2fri]
     set_train_config(drivers=drivers)
 
     # Eco con etiquetas 1Mon..2Fri
-    labels = ["1Mon","1Tue","1Wed","1Thu","1Fri","2Mon","2Tue","2Wed","2Thu","2Fri"]
-    lines = "\n".join(f"{labels[i]} — {drivers[i] or 'Pending'}" for i in range(10))
+    lines = "\n".join(f"{lbl} — {d or 'Pending'}" for lbl, d in zip(_DRIVER_LABELS, drivers))
     await interaction.response.send_message(
         "✅ Train drivers updated:\n" + lines
     )
 
 @app_commands.command(name="train_set_anchor", description="Set rotation anchor Monday (YYYYMMDD of a Monday)")
+@require_role
 async def train_set_anchor(interaction: discord.Interaction, monday_yyyymmdd: str):
-    if not isinstance(interaction.user, discord.Member) or not has_role(interaction.user):
-        return await interaction.response.send_message("No permission.", ephemeral=True)
     if len(monday_yyyymmdd) != 8 or not monday_yyyymmdd.isdigit():
         return await interaction.response.send_message("Use YYYYMMDD.", ephemeral=True)
     y,m,d = int(monday_yyyymmdd[:4]), int(monday_yyyymmdd[4:6]), int(monday_yyyymmdd[6:])
@@ -266,9 +268,8 @@ async def train_set_anchor(interaction: discord.Interaction, monday_yyyymmdd: st
     app_commands.Choice(name="on", value="on"),
     app_commands.Choice(name="off", value="off"),
 ])
+@require_role
 async def train_mode(interaction: discord.Interaction, mode: app_commands.Choice[str]):
-    if not isinstance(interaction.user, discord.Member) or not has_role(interaction.user):
-        return await interaction.response.send_message("No permission.", ephemeral=True)
     set_train_config(post_full_on_monday=(mode.value=="on"))
     await interaction.response.send_message(f"✅ Weekly post on Monday: {mode.value}")
 
@@ -286,14 +287,14 @@ async def train_mode(interaction: discord.Interaction, mode: app_commands.Choice
 async def train_show(interaction: discord.Interaction, mode: app_commands.Choice[str] | None = None):
     cfg = get_train_config()
     drivers = cfg.get("drivers") or []
-    anchor_iso = cfg.get("anchor_monday")
+    anchor_d = get_train_anchor()
 
     # Día de juego actual (cambia 02:00 UTC)
     game_today = to_game_date(now_utc())
     week_monday_game = game_today - timedelta(days=(game_today.isoweekday() - 1))
 
     # Anchor fijo para ambos bloques:
-    anchor_base = date.fromisoformat(anchor_iso) if anchor_iso else week_monday_game
+    anchor_base = anchor_d or week_monday_game
 
     # ----- modos -----
     chosen = (mode.value if isinstance(mode, app_commands.Choice) else "current").lower()
@@ -324,7 +325,7 @@ async def train_show(interaction: discord.Interaction, mode: app_commands.Choice
         wd = day_game.isoweekday()
         if 1 <= wd <= 5:
             # usar el lunes de la semana del día consultado si no hay anchor
-            anchor_for_next = date.fromisoformat(anchor_iso) if anchor_iso else _monday_of(day_game)
+            anchor_for_next = anchor_d or _monday_of(day_game)
             drv = driver_for_day(drivers, anchor_for_next, day_game)
             drv = drv if (drv and drv.strip()) else "Pending"
             pax, bkp = read_draw_for_date(day_real)
@@ -1,24 +1,31 @@
 # ===============================
 # src/commands/weekend_roles.py
 # ===============================
-import random, csv, os
+import heapq
+import csv, os
+from operator import itemgetter
 import discord
 from discord import app_commands
-from datetime import timedelta
-from ..config import ROLE_ADMIN, ROLE_OFFICIAL, THRESHOLD
+from datetime import datetime, timedelta
+from ..config import THRESHOLD
 from ..utils.date_utils import (
     now_utc,
     to_game_date,
     from_game_date,
     yyyymmdd_from_date,
 )
-from ..utils.csv_utils import append_sorteo
+from ..utils.csv_utils import append_sorteos_bulk
 from ..storage import weekly_summary
+from ..utils.auth import has_role
+from ..utils.random_utils import sample_k
 
 
-def has_role(member: discord.Member) -> bool:
-    names = {r.name for r in getattr(member, "roles", [])}
-    return any(r in names for r in ROLE_ADMIN + ROLE_OFFICIAL)
+# isoweekday → nombre (solo sáb/dom se asignan aquí)
+_DAY_NAME = ("?", "?", "?", "?", "?", "?", "Saturday", "Sunday")
+
+
+def _bold_list(names: list[str]) -> str:
+    return ", ".join(f"**{b}**" for b in names) if names else "—"
 
 
 @app_commands.command(
@@ -61,9 +68,9 @@ async def weekend_roles(interaction: discord.Interaction):
         )
 
     # Drivers salen del Top-10 por promedio; Passengers del pool completo (>= THRESHOLD) al azar.
-    averages.sort(key=lambda x: x[1], reverse=True)
-    top10 = [n for n, _ in averages[:10]]     # para Driver
-    avg_pool_all = [n for n, _ in averages]   # para Passenger
+    # Top-10 con heap acotado (mismo orden que sort desc + [:10]); el pool completo no necesita orden.
+    top10 = [n for n, _ in heapq.nlargest(10, averages, key=itemgetter(1))]  # para Driver
+    avg_pool_all = [n for n, _ in averages]                                 # para Passenger
 
     # -------------------------------
     # 3) Fechas objetivo: Sábado y Domingo de la SEMANA SIGUIENTE
@@ -79,9 +86,15 @@ async def weekend_roles(interaction: discord.Interaction):
         targets.append(target_gd)
 
     results: list[tuple[int, str, str, str, list[str]]] = []
+    # {fecha de referencia del CSV: [detalles weekend]}; sáb y dom suelen compartir CSV
+    pending_rows: dict[datetime, list[str]] = {}
 
-    # Evitar repetidos entre sábado y domingo (pasajeros, backups y drivers)
-    used_across_weekend: set[str] = set()  # comparar en minúsculas
+    # Nombres en minúsculas una sola vez; se compara y sortea sobre ellos y se muestra el original.
+    # Evitar repetidos entre sábado y domingo: `remaining_lower` pierde cada nombre al asignarse.
+    display_by_lower = {n.lower(): n for n in avg_pool_all}
+    lower_names = list(display_by_lower)  # orden estable del pool, sin repetidos
+    top10_lower = [n.lower() for n in top10]
+    remaining_lower: set[str] = set(lower_names)
 
     # -------------------------------
     # 4) Asignación por día (Sábado y Domingo)
@@ -90,52 +103,32 @@ async def weekend_roles(interaction: discord.Interaction):
         # Passenger:
         #  - azar total entre todos >= THRESHOLD
         #  - NO excluimos quienes estén en Mon–Vie (permitido repetir con L–V)
-        #  - sí evitamos repetidos entre sábado y domingo (used_across_weekend)
-        passenger_candidates = [n for n in avg_pool_all if n.lower() not in used_across_weekend]
-        if not passenger_candidates:
+        #  - sí evitamos repetidos entre sábado y domingo (remaining_lower)
+        if not remaining_lower:
             return await interaction.response.send_message(
                 "No available passenger candidates for weekend (after removing cross-weekend repeats).",
                 ephemeral=True
             )
-        random.shuffle(passenger_candidates)
-        passenger = passenger_candidates.pop(0)
-
-        # Backups de passenger (también evitando repetidos del mismo fin de semana)
-        passenger_backups: list[str] = []
-        passenger_candidates = [n for n in passenger_candidates if n.lower() not in used_across_weekend]
-        if passenger_candidates:
-            passenger_backups.append(passenger_candidates.pop(0))
-        passenger_candidates = [n for n in passenger_candidates if n.lower() not in used_across_weekend]
-        if passenger_candidates:
-            passenger_backups.append(passenger_candidates.pop(0))
-
-        # Evitar colisión driver/passenger del mismo día
-        used_lower_day = {passenger.lower(), *(b.lower() for b in passenger_backups)}
+        # Passenger + hasta 2 backups en una sola muestra; candidatos en el orden de lower_names
+        # (no el del set, que depende de PYTHONHASHSEED) para que un sorteo con semilla sea reproducible
+        pax_lower = sample_k([n for n in lower_names if n in remaining_lower], 3)
+        remaining_lower.difference_update(pax_lower)
 
         # Driver:
         #  - del Top-10
-        #  - distinto del passenger/backups del día
-        #  - distinto de cualquiera ya usado en el fin de semana (acumulado)
-        driver_pool = [
-            n for n in top10
-            if n.lower() not in used_lower_day and n.lower() not in used_across_weekend
-        ]
+        #  - distinto del passenger/backups del día y de cualquiera ya usado en el fin de semana
+        #    (todos ya salieron de remaining_lower)
+        driver_pool = [n for n in top10_lower if n in remaining_lower]
         if len(driver_pool) < 2:
             return await interaction.response.send_message(
                 "Not enough distinct Top-10 candidates to assign driver and backup.",
                 ephemeral=True
             )
-        random.shuffle(driver_pool)
-        driver = driver_pool.pop(0)
-        driver_backup = driver_pool.pop(0)
-
-        # Marcar todos como usados para el resto del fin de semana
-        used_across_weekend.update({
-            passenger.lower(),
-            *(b.lower() for b in passenger_backups),
-            driver.lower(),
-            driver_backup.lower(),
-        })
+        drv_lower = sample_k(driver_pool, 2)
+        remaining_lower.difference_update(drv_lower)
+
+        passenger, *passenger_backups = (display_by_lower[n] for n in pax_lower)
+        driver, driver_backup = (display_by_lower[n] for n in drv_lower)
 
         # -------------------------------
         # 5) Guardado: CSV del DOMINGO DE LA SEMANA DEL TARGET
@@ -152,18 +145,20 @@ async def weekend_roles(interaction: discord.Interaction):
             f"driver:{driver}|driver_backup:{driver_backup}|"
             f"passenger:{passenger}|passenger_backups:{','.join(passenger_backups)}"
         )
-        append_sorteo(write_ref_dt, "weekend", detail)
+        # Se escribe al final: una sola tanda por CSV y nada a medias si el domingo falla
+        pending_rows.setdefault(write_ref_dt, []).append(detail)
 
         results.append((target_gd.isoweekday(), driver, driver_backup, passenger, passenger_backups))
 
+    for write_ref_dt, details in pending_rows.items():
+        append_sorteos_bulk(write_ref_dt, "weekend", details)
+
     # -------------------------------
     # 6) Mensaje final
     # -------------------------------
-    day_name = {6: "Saturday", 7: "Sunday"}
-    lines = []
-    for wd, driver, driver_backup, passenger, passenger_backups in results:
-        lines.append(
-            f"• {day_name.get(wd, '?')}: Driver **{driver}** (backup **{driver_backup}**), "
-            f"Passenger **{passenger}** (backups {', '.join(f'**{b}**' for b in passenger_backups) if passenger_backups else '—'})"
-        )
-    await interaction.response.send_message("🗓️ **Weekend roles (both days):**\n" + "\n".join(lines))
+    body = "\n".join(
+        f"• {_DAY_NAME[wd]}: Driver **{driver}** (backup **{driver_backup}**), "
+        f"Passenger **{passenger}** (backups {_bold_list(passenger_backups)})"
+        for wd, driver, driver_backup, passenger, passenger_backups in results
+    )
+    await interaction.response.send_message("🗓️ **Weekend roles (both days):**\n" + body)
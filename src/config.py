@@ -3,6 +3,7 @@
 # ===============================
 # src/config.py — robust toggles and constants (server=UTC+00 with 02:00 cutover)
 import os
+import sys
 from dotenv import load_dotenv
 
 # Load .env file (if present)
@@ -37,3 +38,6 @@ MENTION_URGENT = os.getenv("MENTION_URGENT", "")  # e.g. "<@&123456789012345678>
 # Roles
 ROLE_OFFICIAL = [r.strip() for r in os.getenv("ROLE_OFFICIAL", "Official").split(",")]
 ROLE_ADMIN = [r.strip() for r in os.getenv("ROLE_ADMIN", "Admin").split(",")]
+
+# Nombres de rol con permisos (Admin + Official), internados y en frozenset para membership O(1)
+ALLOWED_ROLE_NAMES: frozenset[str] = frozenset(map(sys.intern, filter(None, ROLE_ADMIN + ROLE_OFFICIAL)))
@@ -17,7 +17,7 @@ from .scheduler import Scheduler as EventScheduler
 from .scheduler_train import TrainScheduler
 
 # Commands: points/draw/weekend/status/reset/csv/weeks (assumed existing in your project)
-# If any are not present, comment out their imports/add_command lines.
+# If any are not present, comment out their imports and ALL_COMMANDS entries.
 from .commands.points import points  # /points <name> <amount> [day]
 from .commands.draw import draw      # /draw <D|W>
 from .commands.weekend_roles import weekend_roles
@@ -37,6 +37,14 @@ from .commands.train import (
     train_set_drivers, train_set_anchor, train_mode, train_show
 )
 
+# Todos los slash commands, registrados igual en guild o global
+ALL_COMMANDS = (
+    points, draw, weekend_roles, status, reset, csv_tools, weeks,
+    mg, zs, mg_status, zs_status, auto, redo_d, redo_w,
+    train_set_drivers, train_set_anchor, train_mode, train_show,
+    help_aem, time_lw, reset_all,
+)
+
 # ---------------------- setup ----------------------
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
@@ -54,63 +62,16 @@ async def on_ready():
     try:
         guild_obj = discord.Object(id=GUILD_ID) if GUILD_ID else None
 
+        # Limpia comandos antiguos y registra los actuales: en el guild si hay GUILD_ID (iteración rápida),
+        # si no, global (propagación lenta ~1h). guild=None en la API de discord.py = global.
+        bot.tree.clear_commands(guild=guild_obj)
+        for cmd in ALL_COMMANDS:
+            bot.tree.add_command(cmd, guild=guild_obj)
+
+        await bot.tree.sync(guild=guild_obj)
         if guild_obj:
-            # Limpia comandos antiguos del guild y registra los actuales (iteración rápida)
-            bot.tree.clear_commands(guild=guild_obj)
-
-            # ----- add all commands (guild-scoped) -----
-            bot.tree.add_command(points, guild=guild_obj)
-            bot.tree.add_command(draw, guild=guild_obj)
-            bot.tree.add_command(weekend_roles, guild=guild_obj)
-            bot.tree.add_command(status, guild=guild_obj)
-            bot.tree.add_command(reset, guild=guild_obj)
-            bot.tree.add_command(csv_tools, guild=guild_obj)
-            bot.tree.add_command(weeks, guild=guild_obj)
-
-            bot.tree.add_command(mg, guild=guild_obj)
-            bot.tree.add_command(zs, guild=guild_obj)
-            bot.tree.add_command(mg_status, guild=guild_obj)
-            bot.tree.add_command(zs_status, guild=guild_obj)
-            bot.tree.add_command(auto, guild=guild_obj)
-            bot.tree.add_command(redo_d, guild=guild_obj)
-            bot.tree.add_command(redo_w, guild=guild_obj)
-            bot.tree.add_command(train_set_drivers, guild=guild_obj)
-            bot.tree.add_command(train_set_anchor, guild=guild_obj)
-            bot.tree.add_command(train_mode, guild=guild_obj)
-            bot.tree.add_command(train_show, guild=guild_obj)
-            bot.tree.add_command(help_aem, guild=guild_obj)
-            bot.tree.add_command(time_lw, guild=guild_obj)
-            bot.tree.add_command(reset_all, guild=guild_obj)
-
-            await bot.tree.sync(guild=guild_obj)
             logging.info("Slash commands synced to guild %s", GUILD_ID)
         else:
-            # Sin GUILD_ID: registra global (propagación lenta ~1h). Limpia global antes.
-            bot.tree.clear_commands()
-
-            bot.tree.add_command(points)
-            bot.tree.add_command(draw)
-            bot.tree.add_command(weekend_roles)
-            bot.tree.add_command(status)
-            bot.tree.add_command(reset)
-            bot.tree.add_command(csv_tools)
-            bot.tree.add_command(weeks)
-
-            bot.tree.add_command(mg)
-            bot.tree.add_command(zs)
-            bot.tree.add_command(mg_status)
-            bot.tree.add_command(zs_status)
-            bot.tree.add_command(auto)
-            bot.tree.add_command(redo_d)
-            bot.tree.add_command(redo_w)
-            bot.tree.add_command(train_set_drivers)
-            bot.tree.add_command(train_set_anchor)
-            bot.tree.add_command(train_mode)
-            bot.tree.add_command(train_show)
-            bot.tree.add_command(help_aem)
-            bot.tree.add_command(time_lw)
-
-            await bot.tree.sync()
             logging.info("Slash commands synced globally")
 
         # Start schedulers
@@ -5,37 +5,74 @@
 from __future__ import annotations
 import asyncio
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 import discord
 from discord.ext import tasks
 from .config import (
     ANNOUNCE_CHANNEL_ID, ANNOUNCE_ENABLED,
-    AUTO_DRAW_D, AUTO_DRAW_W, AUTO_VS_REMINDER,
+    AUTO_DRAW_D, AUTO_DRAW_W, AUTO_VS_REMINDER, DATA_DIR, GAME_CUTOVER_UTC,
 )
-from .utils.date_utils import to_game_date, from_game_date
+from .utils.date_utils import to_game_date, from_game_date, game_week_monsat, yyyymmdd_from_date
 from .announcer import (
     send_event_before, send_event_before_urgent, send_week_calendar, send_vs_register_reminder,
 )
-from .storage import get_schedule, has_fired, mark_fired
-from .utils.csv_utils import week_csv_names
+from .storage import get_schedule, has_fired, mark_fired, weekly_summary, last_write_at, transaction
+from .utils.csv_utils import week_csv_names, iter_sorteos_rows, CSV_BUFFER_SIZE
+from .utils.random_utils import partial_shuffle
 from .storage import append_sorteo
 from .storage import __all__ as _unused  # appease lints
 
-# 🔧 Imports requeridos por _has_weekly_draw_written (se usan fuera de funciones)
-import os, csv
+# 🔧 Imports requeridos por _draw_flags (se usan fuera de funciones)
+import os
 
 UTC = timezone.utc
 
 # 🔧 Ventana mínima sin escrituras antes de cualquier Auto Draw (para evitar correr con datos incompletos)
 INGEST_QUIET_MINUTES = 5
 
+# Avisos previos: (etiqueta, segundos antes del evento)
+_FIRE_MARKS = (("24h", 86400.0), ("12h", 43200.0), ("10m", 600.0), ("5m", 300.0))
+
+
+def _fire_offsets(before: float) -> tuple[int, ...]:
+    # Días candidatos (respecto del día de juego actual) que pueden caer en la ventana ±59 s de un aviso.
+    # El evento cae en [día 00:00, día 23:59] UTC y "ahora" en [hoy C:00, mañana C:00) UTC (C = cutover),
+    # así que event - now ∈ (o·24h − 24h − C, o·24h + 23:59 − C).
+    c = GAME_CUTOVER_UTC * 3600
+    return tuple(
+        o for o in range(-1, 8)
+        if o * 86400 - 86400 - c < before + 59 and o * 86400 + 86340 - c > before - 59
+    )
+
+
+# {etiqueta: offsets posibles}; p. ej. con cutover 02:00 → 24h: (1, 2), 12h/10m/5m: (0, 1)
+_LABEL_OFFSETS = {label: _fire_offsets(before) for label, before in _FIRE_MARKS}
+# Solo estos días se evalúan en cada tick (antes: siempre -1..7)
+_CANDIDATE_OFFSETS = tuple(sorted({o for offs in _LABEL_OFFSETS.values() for o in offs}))
+
 EVENT_LABELS = {
     "MG": ("MG", "Marshall’s Guard / MG", 2),
     "ZS": ("ZS", "Zombie Siege / ZS", 3),
 }
 
+@lru_cache(maxsize=256)
+def _fire_key(kind: str, gd_iso: str, label: str) -> str:
+    # Clave de has_fired/mark_fired para un aviso; se repite en cada tick de la ventana (±59 s)
+    return f"{kind}:{gd_iso}:T-{label}"
+
+def _split_hhmm(hhmm: str) -> tuple[int, int] | None:
+    # "HHmm" → (hh, mm) tal cual lo leía el loop de avisos; None si no es numérico
+    try:
+        return int(hhmm[:2]), int(hhmm[2:])
+    except Exception:
+        return None
+
 class Scheduler:
     def __init__(self, bot: discord.Client):
         self.bot = bot
+        self._tick_tasks: list[asyncio.Task] = []  # envíos lanzados en el tick actual
+        # {kind: (first_utc crudo, updated_at crudo, first parseado, updated parseado)}; se reparsea solo si cambia el texto
+        self._schedule_cache: dict[str, tuple[str | None, str | None, datetime | None, datetime | None]] = {}
 
     def channel(self):
         return self.bot.get_channel(ANNOUNCE_CHANNEL_ID) if ANNOUNCE_CHANNEL_ID else None
@@ -72,66 +109,111 @@ class Scheduler:
             if self._ingest_quiet_period_ok(INGEST_QUIET_MINUTES):
                 await self._maybe_auto_draw_w(gd)
 
-        # 04) Event reminders (MG/ZS) 24h/12h/10m/5m
+        # 04) Event reminders (MG/ZS) 24h/12h/10m/5m — se envían en paralelo y se esperan al final del tick
+        now_ts = now.timestamp()
         for kind in ("MG", "ZS"):
-            await self._handle_event(now, ch, kind=kind)
+            await self._handle_event(now, now_ts, ch, kind=kind)
 
         # 05) Weekly calendar at start of game Sunday (02:00 UTC)
         if hhmm == "02:00" and gd.isoweekday() == 7:
             await self._maybe_send_week_calendar(now, ch)
 
+        if self._tick_tasks:
+            tasks_, self._tick_tasks = self._tick_tasks, []
+            results = await asyncio.gather(*tasks_, return_exceptions=True)
+            # Marcas de los envíos que salieron bien, en una sola escritura de data.json
+            sent = [r for r in results if isinstance(r, str)]
+            if sent:
+                with transaction() as state:
+                    for key in sent:
+                        mark_fired(key, _state=state)
+            for r in results:
+                if isinstance(r, BaseException):
+                    raise r
+
     # ---------- helpers ----------
-    async def _handle_event(self, now: datetime, ch, *, kind: str):
+    async def _handle_event(self, now: datetime, now_ts: float, ch, *, kind: str):
         sched = get_schedule(kind)
         if not sched:
             return
-        try:
-            first = datetime.fromisoformat(sched["first_utc"]).astimezone(UTC)
-        except Exception:
+        first, _ = self._schedule_times(kind, sched)
+        if first is None:
             return
         code, full, repeat_days = EVENT_LABELS[kind]
         hhmm_default = sched.get("hhmm_server", "0000")
         hhmm_weekend = sched.get("weekend_hhmm") or hhmm_default
 
+        # Horas ya partidas (una vez por tick, no por día candidato); None = HHmm inválido
+        hm_default = _split_hhmm(hhmm_default)
+        hm_weekend = _split_hhmm(hhmm_weekend)
+
         gd_today = to_game_date(now)
         first_gd = to_game_date(first)
-        for day_offset in range(-1, 8):
-            gd_candidate = gd_today + timedelta(days=day_offset)
-            delta_days = (gd_candidate - first_gd).days
+        # Aritmética entera de ordinales en vez de restar fechas
+        today_ord = gd_today.toordinal()
+        first_ord = first_gd.toordinal()
+        for day_offset in _CANDIDATE_OFFSETS:
+            delta_days = today_ord + day_offset - first_ord
             if delta_days < 0 or (delta_days % repeat_days) != 0:
                 continue
-            is_weekend = gd_candidate.isoweekday() in (6, 7)
-            hhmm = hhmm_weekend if is_weekend else hhmm_default
-            try:
-                hh, mm = int(hhmm[:2]), int(hhmm[2:])
-            except Exception:
+            gd_candidate = gd_today + timedelta(days=day_offset)
+            if gd_candidate.isoweekday() >= 6:  # Sat/Sun
+                hhmm, hm = hhmm_weekend, hm_weekend
+            else:
+                hhmm, hm = hhmm_default, hm_default
+            if hm is None:
                 continue
+            hh, mm = hm
             event_utc_hour = (hh + 2) % 24
             base = from_game_date(gd_candidate)
             event_dt = base.replace(hour=event_utc_hour, minute=mm)
 
-            await self._maybe_fire(ch, kind, code, full, gd_candidate, hhmm, event_dt, now, label="24h", delta=timedelta(hours=24))
-            await self._maybe_fire(ch, kind, code, full, gd_candidate, hhmm, event_dt, now, label="12h", delta=timedelta(hours=12))
-            await self._maybe_fire(ch, kind, code, full, gd_candidate, hhmm, event_dt, now, label="10m", delta=timedelta(minutes=10))
-            await self._maybe_fire(ch, kind, code, full, gd_candidate, hhmm, event_dt, now, label="5m",  delta=timedelta(minutes=5))
-
-    async def _maybe_fire(self, ch, kind: str, code: str, full: str, gd_candidate, hhmm_server: str, event_dt: datetime, now: datetime, *, label: str, delta: timedelta):
-        mark_time = event_dt - delta
-        if abs((now - mark_time).total_seconds()) <= 59:
-            key = f"{kind}:{gd_candidate.isoformat()}:T-{label}"
+            event_ts = event_dt.timestamp()
+            gd_iso = gd_candidate.isoformat()  # YYYY-MM-DD: clave de disparo y fecha mostrada
+            for label, before in _FIRE_MARKS:
+                if day_offset not in _LABEL_OFFSETS[label]:
+                    continue
+                await self._maybe_fire(ch, kind, code, full, gd_iso, hhmm, event_ts, now_ts, label=label, before=before)
+
+    async def _maybe_fire(self, ch, kind: str, code: str, full: str, gd_iso: str, hhmm_server: str, event_ts: float, now_ts: float, *, label: str, before: float):
+        # Epoch en segundos (float): sin restas de datetime/timedelta por cada aviso
+        if abs(now_ts - (event_ts - before)) <= 59.0:
+            key = _fire_key(kind, gd_iso, label)
             if has_fired(key):
                 return
-            server_date_str = gd_candidate.strftime("%Y-%m-%d")
+            server_date_str = gd_iso
             server_time_str = f"{hhmm_server[:2]}:{hhmm_server[2:]}"
-            eta_seconds = int((event_dt - now).total_seconds())
+            eta_seconds = int(event_ts - now_ts)
             if label in ("10m", "5m"):
-                await send_event_before_urgent(ch, code, full, server_date_str, server_time_str, eta_seconds, final=(label=="5m"))
+                send = send_event_before_urgent(ch, code, full, server_date_str, server_time_str, eta_seconds, final=(label=="5m"))
             else:
-                await send_event_before(ch, code, full, server_date_str, server_time_str, eta_seconds)
-            mark_fired(key)
+                send = send_event_before(ch, code, full, server_date_str, server_time_str, eta_seconds)
+            self._tick_tasks.append(asyncio.create_task(self._send_and_mark(send, key)))
+
+    async def _send_and_mark(self, send, key: str) -> str:
+        # Devuelve la clave solo si el envío terminó bien; el tick la marca como disparada al final
+        await send
+        return key
+
+    def _schedule_times(self, kind: str, sched: dict) -> tuple[datetime | None, datetime | None]:
+        # (first_utc, updated_at) ya en UTC; memo por el texto guardado (solo cambia al reconfigurar)
+        raw_first = sched.get("first_utc")
+        raw_upd = sched.get("updated_at")
+        hit = self._schedule_cache.get(kind)
+        if hit is not None and hit[0] == raw_first and hit[1] == raw_upd:
+            return hit[2], hit[3]
+        try:
+            first = datetime.fromisoformat(raw_first).astimezone(UTC)
+        except Exception:
+            first = None
+        try:
+            upd = datetime.fromisoformat(raw_upd).astimezone(UTC)
+        except Exception:
+            upd = None
+        self._schedule_cache[kind] = (raw_first, raw_upd, first, upd)
+        return first, upd
 
     async def _maybe_send_week_calendar(self, now: datetime, ch):
-        from .storage import get_schedule
         entries = []
         gd_sun = to_game_date(now)
         gd_mon = gd_sun - timedelta(days=6)
@@ -142,13 +224,11 @@ class Scheduler:
             sched = get_schedule(kind)
             if not sched:
                 continue
-            try:
-                upd = datetime.fromisoformat(sched.get("updated_at")).astimezone(UTC)
-            except Exception:
-                upd = None
+            first, upd = self._schedule_times(kind, sched)
             if upd and to_game_date(upd) >= gd_mon:
                 continue
-            first = datetime.fromisoformat(sched["first_utc"]).astimezone(UTC)
+            if first is None:
+                continue
             first_gd = to_game_date(first)
             code, full, interval = EVENT_LABELS[kind]
             hhmm_default = sched.get("hhmm_server", "0000")
@@ -168,38 +248,43 @@ class Scheduler:
             mark_fired(f"CAL:{week_key}")
 
     # ---------- auto draw D/W ----------
-    def _has_weekly_draw_written(self, week_dt: datetime) -> bool:
-        names = week_csv_names(week_dt)
-        path = names["sorteos"]
+    def _draw_flags(self, path: str, d_for_key: str | None = None) -> tuple[bool, bool]:
+        """
+        Una sola pasada por el CSV de sorteos de la semana: (hay W, hay D con for:d_for_key).
+        Corta en cuanto sabe ambas cosas (o solo la W si no se pide D).
+        """
         if not os.path.exists(path):
-            return False
-        with open(path, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if (row.get("tipo") or "").upper() == "W":
-                    return True
-        return False
+            return False, False
+        needle = f"for:{d_for_key}" if d_for_key else None
+        has_w = has_d = False
+        with open(path, "r", encoding="utf-8", newline="", buffering=CSV_BUFFER_SIZE) as f:
+            # csv.reader con índice de columna (sin dict por fila)
+            for tipo, det in iter_sorteos_rows(f):
+                tipo = tipo.upper()
+                if tipo == "W":
+                    has_w = True
+                elif tipo == "D" and needle and needle in det:
+                    has_d = True
+                if has_w and (has_d or not needle):
+                    break
+        return has_w, has_d
+
+    def _has_weekly_draw_written_path(self, path: str) -> bool:
+        return self._draw_flags(path)[0]
 
     def _has_full_week_data(self, week_dt: datetime) -> bool:
         # basic check via weekly_summary to see Mon..Sat present and pool >=5
-        from .storage import weekly_summary
         s = weekly_summary()  # ← API actual: usa la semana actual de juego
 
-        per_days = s.get("days", {})  # { 'YYYYMMDD': [ ... ] }
-        days_present = list(per_days.keys())
+        per_days = s.get("days", {})  # { 'YYYYMMDD': {name: points} }
 
         # Expect at least 6 days (Mon..Sat) present
-        if len(days_present) < 6:
+        if len(per_days) < 6:
             return False
 
-        # Check each Mon..Sat has records
-        from .utils.date_utils import game_week_monsat, yyyymmdd_from_date
-        ok = True
-        for d in game_week_monsat(week_dt):
-            if yyyymmdd_from_date(d) not in per_days:
-                ok = False
-                break
-        if not ok:
+        # Check each Mon..Sat has records (issubset sobre las claves del dict, en C)
+        needed = frozenset(yyyymmdd_from_date(d) for d in game_week_monsat(week_dt))
+        if not needed.issubset(per_days):
             return False
 
         # Pool por promedios >= 7.2M (s['averages'] ya es nombre -> número)
@@ -207,69 +292,56 @@ class Scheduler:
         return len(pool) >= 5
 
     async def _maybe_auto_draw_d(self, gd_today: date):
-        import random  # se usa localmente aquí
         # base is yesterday game-day
         base = gd_today - timedelta(days=1)
         if base.isoweekday() == 7:
             return  # never based on Sunday
-        from .utils.date_utils import yyyymmdd_from_date, from_game_date
-        from .storage import weekly_summary
         week_dt = from_game_date(base)
 
-        # Skip if a weekly draw exists for this week
-        if self._has_weekly_draw_written(week_dt):
-            return
-
-        # If already have D for today, skip
+        # Skip if a weekly draw exists for this week, or if already have D for today (una sola lectura)
+        # Ruta del CSV de sorteos de la semana resuelta una vez por draw
+        path = week_csv_names(week_dt)["sorteos"]
         today_key = yyyymmdd_from_date(gd_today)
-        names = week_csv_names(week_dt)
-        path = names["sorteos"]
-        if os.path.exists(path):
-            with open(path, "r", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if (row.get("tipo") or "").upper() == "D" and f"for:{today_key}" in (row.get("detalle") or ""):
-                        return
+        has_w, has_d_today = self._draw_flags(path, today_key)
+        if has_w or has_d_today:
+            return
 
         # Build eligibles from base day (usa la clave actual 'eligibles_by_day')
         s = weekly_summary()  # semana actual
         base_key = yyyymmdd_from_date(base)
-        eligibles = list(set(s.get("eligibles_by_day", {}).get(base_key, [])))
+        # dict.fromkeys: quita repetidos conservando el orden (sorteo reproducible con la misma semilla)
+        eligibles = list(dict.fromkeys(s.get("eligibles_by_day", {}).get(base_key, [])))
         if not eligibles:
             return
 
-        random.shuffle(eligibles)
+        partial_shuffle(eligibles, 3)
         passenger = eligibles[0]
         backups = eligibles[1:3]
         detail = f"D|for:{today_key}|passenger:{passenger}|backups:{','.join(backups)}"
         append_sorteo(week_dt, "D", detail)
 
     async def _maybe_auto_draw_w(self, gd_sun: date):
-        import random  # se usa localmente aquí
-        from .utils.date_utils import from_game_date, game_week_monsat, yyyymmdd_from_date
         week_dt = from_game_date(gd_sun)
-        if self._has_weekly_draw_written(week_dt):
+        if self._has_weekly_draw_written_path(week_csv_names(week_dt)["sorteos"]):
             return
         if not self._has_full_week_data(week_dt):
             return
 
         # Build pool by averages ≥ 7.2M
-        from .storage import weekly_summary
         s = weekly_summary()  # semana actual
         averages = [n for n, avg in s.get("averages", {}).items() if avg >= 7_200_000]
         if len(averages) < 5:
             return
 
-        pool = averages.copy()
-        random.shuffle(pool)
+        # Solo se usan hasta 15 (5 días × passenger + 2 backups): basta barajar ese prefijo
+        pool = averages
+        partial_shuffle(pool, 15)
         days = game_week_monsat(week_dt)
-        for d in days[:5]:
-            if not pool:
+        for i, d in enumerate(days[:5]):
+            if 3 * i >= len(pool):
                 break
-            passenger = pool.pop(0)
-            bks = []
-            if pool: bks.append(pool.pop(0))
-            if pool: bks.append(pool.pop(0))
+            passenger = pool[3 * i]
+            bks = pool[3 * i + 1:3 * i + 3]
             detail = f"W|for:{yyyymmdd_from_date(d)}|passenger:{passenger}|backups:{','.join(bks)}"
             append_sorteo(week_dt, "W", detail)
 
@@ -277,10 +349,13 @@ class Scheduler:
     def _ingest_quiet_period_ok(self, minutes: int) -> bool:
         """
         Devuelve True si no ha habido escrituras recientes en el storage.
-        Usa el mtime de data.json como indicador de actividad.
+        Usa la última escritura de data.json registrada en memoria por storage (sin stat por tick);
+        si este proceso aún no escribió, cae al mtime del archivo (escrituras previas a un reinicio).
         """
+        last_write = last_write_at()
+        if last_write is not None:
+            return (datetime.now(UTC) - last_write) >= timedelta(minutes=minutes)
         try:
-            from .config import DATA_DIR
             data_path = os.path.join(DATA_DIR, "data.json")
             mtime = os.path.getmtime(data_path)
         except FileNotFoundError:
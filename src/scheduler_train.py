@@ -3,37 +3,36 @@
 # ===============================
 # posts at 01:00 server and 14:30 server; waits if passenger missing
 from __future__ import annotations
-from datetime import datetime, timedelta, timezone, date
-import os
-import csv
+from datetime import datetime, timedelta, timezone, date, time as dtime
+import asyncio
+import logging
+import re
 import discord
-from discord.ext import tasks
 
 from .config import ANNOUNCE_CHANNEL_ID, ANNOUNCE_ENABLED, AUTO_TRAIN_POST
 from .utils.date_utils import to_game_date, from_game_date
 from .utils.train_utils import driver_for_day, read_draw_for_date
 from .announcer_train import send_train_day, send_train_week
-from .storage import get_train_config
-from .utils.csv_utils import week_csv_names
+from .storage import get_train_config, get_train_anchor
+from .utils.csv_utils import week_csv_names, iter_sorteos_rows, cached_file_index
 
 UTC = timezone.utc
+logger = logging.getLogger(__name__)
+
+# Reintento mientras falta el VIP del día (misma cadencia que el antiguo tick por minuto)
+_PENDING_RETRY_SECONDS = 60
 
 # -------------------------------------------------------
 # Helpers locales para leer weekend (driver/pax) del CSV
 # -------------------------------------------------------
 
+# Claves conocidas de "detalle"; el prefijo de tipo ("weekend|", "W|", "D|") no tiene ':' y no coincide
+_KV_RE = re.compile(r"(?:^|\|)\s*(for|driver_backup|driver|passenger_backups|passenger)\s*:([^|]*)", re.I)
+
 def _parse_pipe_kv(detail: str) -> dict[str, str]:
     # Convierte "weekend|for:YYYYMMDD|driver:...|driver_backup:...|passenger:...|passenger_backups:A,B"
     # a {"for": "...", "driver": "...", "driver_backup": "...", "passenger": "...", "passenger_backups": "..."}
-    s = detail or ""
-    if s.startswith(("W|", "D|", "weekend|")):
-        s = s.split("|", 1)[1] if "|" in s else ""
-    out: dict[str, str] = {}
-    for part in s.split("|"):
-        if ":" in part:
-            k, v = part.split(":", 1)
-            out[k.strip().lower()] = v.strip()
-    return out
+    return {m.group(1).lower(): m.group(2).strip() for m in _KV_RE.finditer(detail or "")}
 
 def _utc_from_date(d: date) -> datetime:
     return datetime(d.year, d.month, d.day, tzinfo=UTC)
@@ -47,7 +46,32 @@ def _prev_sunday_ref(d: date) -> datetime:
 def _this_week_ref(d: date) -> datetime:
     return _utc_from_date(d)
 
-def _read_weekend_for_date(real_day: date) -> tuple[str | None, str | None, str | None, str | None]:
+_WeekendRow = tuple[str | None, str | None, str | None, str | None]
+_NO_WEEKEND: _WeekendRow = (None, None, None, None)
+
+# Índice weekend por CSV (cached_file_index): {for_yyyymmdd: (driver, driver_backup, passenger, pax_backup_1)}
+# Se reconstruye solo cuando el archivo cambia; gana la primera fila de cada fecha.
+def _build_weekend_index(f) -> dict[str, _WeekendRow]:
+    index: dict[str, _WeekendRow] = {}
+    for tipo, det in iter_sorteos_rows(f):
+        if tipo.strip().lower() != "weekend":
+            continue
+        kv = _parse_pipe_kv(det)
+        target = kv.get("for")
+        if target is None or target in index:
+            continue
+        drv = (kv.get("driver") or "").strip() or None
+        drv_b = (kv.get("driver_backup") or "").strip() or None
+        pax = (kv.get("passenger") or "").strip() or None
+        pax_b1 = None
+        backs = kv.get("passenger_backups") or ""
+        if backs:
+            first = (backs.split(",")[0] or "").strip()
+            pax_b1 = first or None
+        index[target] = (drv, drv_b, pax, pax_b1)
+    return index
+
+def _read_weekend_for_date(real_day: date) -> _WeekendRow:
     """
     Lee un registro 'weekend' para 'real_day' (sábado o domingo).
     Devuelve: (driver, driver_backup, passenger, passenger_backup_1)
@@ -58,28 +82,12 @@ def _read_weekend_for_date(real_day: date) -> tuple[str | None, str | None, str
     # así que buscamos primero en el CSV del domingo previo; si no, en el actual.
     for ref in (_prev_sunday_ref(real_day), _this_week_ref(real_day)):
         path = week_csv_names(ref)["sorteos"]
-        if not path or not os.path.exists(path):
-            continue
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if (row.get("tipo") or "").strip().lower() != "weekend":
-                        continue
-                    kv = _parse_pipe_kv(row.get("detalle") or "")
-                    if kv.get("for") == target:
-                        drv = (kv.get("driver") or "").strip() or None
-                        drv_b = (kv.get("driver_backup") or "").strip() or None
-                        pax = (kv.get("passenger") or "").strip() or None
-                        pax_b1 = None
-                        backs = kv.get("passenger_backups") or ""
-                        if backs:
-                            first = (backs.split(",")[0] or "").strip()
-                            pax_b1 = first or None
-                        return drv, drv_b, pax, pax_b1
-        except Exception:
+        if not path:
             continue
-    return (None, None, None, None)
+        index = cached_file_index(path, _build_weekend_index, None)
+        if index and target in index:
+            return index[target]
+    return _NO_WEEKEND
 
 class TrainScheduler:
     """
@@ -91,56 +99,80 @@ class TrainScheduler:
     """
     def __init__(self, bot: discord.Client):
         self.bot = bot
-        self._posted_today_0100: date | None = None
-        self._posted_today_1430: date | None = None
         self._pending_day: date | None = None
+        self._pending_task: asyncio.Task | None = None
         self._posted_weekly_for_monday: date | None = None  # lunes (game-day) para el que ya se publicó resumen
+        self._tasks: list[asyncio.Task] = []
 
     def channel(self):
         return self.bot.get_channel(ANNOUNCE_CHANNEL_ID) if ANNOUNCE_CHANNEL_ID else None
 
     def start(self):
-        if ANNOUNCE_ENABLED and AUTO_TRAIN_POST:
-            self.loop.start()
-
-    @tasks.loop(minutes=1)
-    async def loop(self):
-        ch = self.channel()
-        if not ch:
-            return
-
+        if ANNOUNCE_ENABLED and AUTO_TRAIN_POST and not self._tasks:
+            # Se despierta solo a la hora de cada publicación (no un tick por minuto)
+            loop = asyncio.get_running_loop()
+            self._tasks = [
+                loop.create_task(self._run_at(dtime(3, 0), self._post_0100)),    # 01:00 server
+                loop.create_task(self._run_at(dtime(16, 30), self._post_1430)),  # 14:30 server
+            ]
+
+    async def _run_at(self, t_utc: dtime, cb):
+        # Llama a cb cada día a la hora t_utc; se vuelve a dormir aunque cb falle
         now = datetime.now(UTC)
-        gd = to_game_date(now)  # fecha de juego (server-day con corte 02:00 UTC)
-        hhmm = now.strftime("%H:%M")
-
-        # 01:00 server == 03:00 UTC
-        if hhmm == "03:00" and self._posted_today_0100 != gd:
-            ok = await self._try_post_for_day(ch, gd, when_title="Today 01:00 server")
-            if not ok:
-                await self._safe_send(ch, "📝 Falta pasajero VIP hoy. Registra puntos y/o corre `draw D` para publicar el tren.")
-                self._pending_day = gd
-            self._posted_today_0100 = gd
-
-            # Si es lunes (game-day) y está habilitado, publicar semanal Mon–Sun una vez
-            if gd.isoweekday() == 1 and self._posted_weekly_for_monday != gd:
-                await self.post_weekly_if_enabled(ch, gd)
-                self._posted_weekly_for_monday = gd
-
-        # 14:30 server == 16:30 UTC
-        if hhmm == "16:30" and self._posted_today_1430 != gd:
-            await self._try_post_for_day(ch, gd, when_title="Today 14:30 server (reminder)")
-            self._posted_today_1430 = gd
-
-        # Si quedó pendiente, intentamos publicar cuando aparezca el VIP (mismo game day)
-        if self._pending_day is not None and self._pending_day == to_game_date(now):
-            ok = await self._try_post_for_day(ch, gd, when_title="Update — Train (passenger available)")
+        target = datetime.combine(now.date(), t_utc, tzinfo=UTC)
+        if target <= now:
+            target += timedelta(days=1)
+        while True:
+            # asyncio.sleep puede despertar unos ms antes: volver a dormir hasta la hora exacta
+            while (wait := (target - datetime.now(UTC)).total_seconds()) > 0:
+                await asyncio.sleep(wait)
+            ch = self.channel()
+            if ch:
+                try:
+                    await cb(ch, to_game_date(target))
+                except Exception:
+                    logger.exception("Train post at %s UTC failed", t_utc.strftime("%H:%M"))
+            target += timedelta(days=1)
+
+    async def _post_0100(self, ch: discord.abc.MessageableChannel, gd: date):
+        ok = await self._try_post_for_day(ch, gd, when_title="Today 01:00 server")
+        if not ok:
+            await self._safe_send(ch, "📝 Falta pasajero VIP hoy. Registra puntos y/o corre `draw D` para publicar el tren.")
+            self._set_pending(gd)
+
+        # Si es lunes (game-day) y está habilitado, publicar semanal Mon–Sun una vez
+        if gd.isoweekday() == 1 and self._posted_weekly_for_monday != gd:
+            await self.post_weekly_if_enabled(ch, gd)
+            self._posted_weekly_for_monday = gd
+
+    async def _post_1430(self, ch: discord.abc.MessageableChannel, gd: date):
+        await self._try_post_for_day(ch, gd, when_title="Today 14:30 server (reminder)")
+
+    def _set_pending(self, gd: date):
+        self._pending_day = gd
+        if self._pending_task is None or self._pending_task.done():
+            self._pending_task = asyncio.get_running_loop().create_task(self._retry_pending())
+
+    async def _retry_pending(self):
+        # Solo vive mientras haya un día pendiente: reintenta cada minuto hasta que aparezca el VIP
+        # o cambie el game-day
+        while self._pending_day is not None:
+            await asyncio.sleep(_PENDING_RETRY_SECONDS)
+            gd = to_game_date(datetime.now(UTC))
+            if self._pending_day != gd:
+                self._pending_day = None
+                break
+            ch = self.channel()
+            if not ch:
+                continue
+            try:
+                ok = await self._try_post_for_day(ch, gd, when_title="Update — Train (passenger available)")
+            except Exception:
+                logger.exception("Train pending retry failed")
+                continue
             if ok:
                 self._pending_day = None
 
-        # Limpieza: si cambió de game-day, reiniciar flags de día (por si el bot estuvo pausado)
-        if self._posted_today_0100 and self._posted_today_0100 != gd and self._pending_day and self._pending_day != gd:
-            self._pending_day = None
-
     async def _try_post_for_day(self, ch: discord.abc.MessageableChannel, game_day: date, *, when_title: str) -> bool:
         """
         Publica el mensaje del día si:
@@ -152,17 +184,9 @@ class TrainScheduler:
         if game_day.isoweekday() not in (1, 2, 3, 4, 5):
             return True  # No hay tren en fin de semana
 
-        cfg = get_train_config()
-        drivers10 = cfg.get("drivers", [])
-        anchor = cfg.get("anchor_monday")
-        if not anchor or not drivers10:
-            return False
-
-        # ancla (ISO) → date
-        from datetime import date as _date
-        try:
-            anchor_d = _date.fromisoformat(anchor)
-        except Exception:
+        drivers10 = get_train_config().get("drivers", [])
+        anchor_d = get_train_anchor()
+        if anchor_d is None or not drivers10:
             return False
 
         # Conductor según rotación 2 semanas
@@ -194,14 +218,8 @@ class TrainScheduler:
             return
 
         drivers10 = cfg.get("drivers", [])
-        anchor = cfg.get("anchor_monday")
-        if not anchor or not drivers10:
-            return
-
-        from datetime import date as _date
-        try:
-            anchor_d = _date.fromisoformat(anchor)
-        except Exception:
+        anchor_d = get_train_anchor()
+        if anchor_d is None or not drivers10:
             return
 
         # lunes de la semana del game_day
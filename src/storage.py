@@ -3,7 +3,9 @@
 # ===============================
 # src/storage.py — persistence (JSON + CSV appends) with robust helpers
 from __future__ import annotations
-import json, os, csv
+import json, os, csv, re
+from functools import lru_cache
+from contextlib import contextmanager
 from typing import Any, Dict, List, Tuple, Optional
 from datetime import datetime, timedelta, timezone, date, time
 
@@ -49,10 +51,12 @@ def _levenshtein(a: str, b: str) -> int:
         prev = curr
     return prev[-1]
 
+_ALNUM_RE = re.compile(r"[A-Za-z0-9]")
+_ALPHA_RE = re.compile(r"[A-Za-z]")
+
 def _first_last_alnum_equal(a: str, b: str) -> bool:
-    import re
-    ra = re.findall(r"[A-Za-z0-9]", a)
-    rb = re.findall(r"[A-Za-z0-9]", b)
+    ra = _ALNUM_RE.findall(a)
+    rb = _ALNUM_RE.findall(b)
     if not ra or not rb:
         return False
     return (ra[0].casefold() == rb[0].casefold()) and (ra[-1].casefold() == rb[-1].casefold())
@@ -80,9 +84,8 @@ def _pick_display_name(a: str, b: str) -> str:
       - Empate: preferimos el más largo.
       - Último recurso: 'a'.
     """
-    import re
-    na = len(re.findall(r"[A-Za-z]", a or ""))
-    nb = len(re.findall(r"[A-Za-z]", b or ""))
+    na = len(_ALPHA_RE.findall(a or ""))
+    nb = len(_ALPHA_RE.findall(b or ""))
     if nb > na:
         return b
     if nb == na and len(b or "") > len(a or ""):
@@ -93,30 +96,99 @@ DATA_JSON = os.path.join(DATA_DIR, "data.json")
 
 # -------------------- core load/save --------------------
 
-def _load() -> Dict[str, Any]:
-    os.makedirs(DATA_DIR, exist_ok=True)
-    if not os.path.exists(DATA_JSON):
+# Estado parseado en memoria, válido mientras (mtime ns, tamaño) de data.json no cambie.
+# Los getters de solo lectura lo consultan directo (_peek) y copian solo lo que devuelven;
+# los caminos load→mutar→save usan _load, que entrega una copia completa.
+_CACHE: Dict[str, Any] | None = None
+_CACHE_STAMP: tuple[int, int] | None = None
+
+def _clone(obj: Any) -> Any:
+    # Copia profunda de datos JSON (dict/list/escalares); más barata que copy.deepcopy
+    if isinstance(obj, dict):
+        return {k: _clone(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_clone(v) for v in obj]
+    return obj
+
+def _stamp() -> tuple[int, int] | None:
+    try:
+        st = os.stat(DATA_JSON)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+def _peek() -> Dict[str, Any]:
+    # Estado cacheado SIN copiar: no mutar lo devuelto
+    global _CACHE, _CACHE_STAMP
+    stamp = _stamp()
+    if stamp is None:
+        os.makedirs(DATA_DIR, exist_ok=True)
+        _CACHE, _CACHE_STAMP = None, None
         return {}
-    with open(DATA_JSON, "r", encoding="utf-8") as f:
-        try:
-            return json.load(f)
-        except Exception:
-            return {}
+    if _CACHE is None or stamp != _CACHE_STAMP:
+        with open(DATA_JSON, "r", encoding="utf-8") as f:
+            try:
+                state = json.load(f)
+            except Exception:
+                state = {}
+        if not isinstance(state, dict):
+            state = {}
+        _migrate_points(state)
+        _CACHE, _CACHE_STAMP = state, stamp
+    return _CACHE
+
+def _load() -> Dict[str, Any]:
+    # Copia completa para mutar y pasar a _save
+    return _clone(_peek())
+
+# Contador de escrituras en este proceso (invalida cachés derivados aunque el mtime no cambie)
+_STATE_EPOCH = 0
+# Momento (UTC) de la última escritura de data.json hecha por este proceso
+_LAST_WRITE_AT: datetime | None = None
 
 def _save(state: Dict[str, Any]) -> None:
+    global _STATE_EPOCH, _LAST_WRITE_AT, _CACHE, _CACHE_STAMP
     os.makedirs(DATA_DIR, exist_ok=True)
     tmp = DATA_JSON + ".tmp"
     with open(tmp, "w", encoding="utf-8") as f:
         json.dump(state, f, ensure_ascii=False, indent=2)
     os.replace(tmp, DATA_JSON)
+    # Copia propia: el llamador puede seguir usando (y mutando) su dict
+    _CACHE, _CACHE_STAMP = _clone(state), _stamp()
+    _STATE_EPOCH += 1
+    _LAST_WRITE_AT = datetime.now(UTC)
+
+@contextmanager
+def transaction():
+    """
+    Un solo _load→_save para varias mutaciones: los setters reciben _state=s y no leen/escriben por su cuenta.
+    Si el bloque falla no se guarda nada.
+    """
+    state = _load()
+    yield state
+    _save(state)
+
+def reset_all_state() -> None:
+    """Deja data.json en {} por la vía normal de _save (escritura atómica + invalida cachés y versión)."""
+    _save({})
+
+def last_write_at() -> datetime | None:
+    """Última escritura de data.json en este proceso (None si aún no hubo ninguna)."""
+    return _LAST_WRITE_AT
+
+def _data_mtime_ns() -> int | None:
+    try:
+        return os.stat(DATA_JSON).st_mtime_ns
+    except FileNotFoundError:
+        return None
 
 # -------------------- schedules (MG/ZS) --------------------
 
 def _ensure_schedules(state: Dict[str, Any]):
     state.setdefault("schedules", {"MG": None, "ZS": None})
 
-def set_schedule(kind: str, first_utc_iso: str, hhmm_server: str, repeat_days: int, weekend_hhmm: str | None = None) -> None:
-    state = _load()
+def set_schedule(kind: str, first_utc_iso: str, hhmm_server: str, repeat_days: int, weekend_hhmm: str | None = None, *, _state: Dict[str, Any] | None = None) -> None:
+    state = _load() if _state is None else _state
     _ensure_schedules(state)
     state["schedules"][kind] = {
         "first_utc": first_utc_iso,
@@ -125,12 +197,18 @@ def set_schedule(kind: str, first_utc_iso: str, hhmm_server: str, repeat_days: i
         "repeat_days": int(repeat_days),
         "updated_at": datetime.now(UTC).isoformat(),
     }
-    _save(state)
+    if _state is None:
+        _save(state)
 
 def get_schedule(kind: str) -> Dict[str, Any] | None:
-    state = _load()
-    _ensure_schedules(state)
-    return state["schedules"].get(kind)
+    return _clone((_peek().get("schedules") or {}).get(kind))
+
+def get_state_version() -> tuple[int, int | None]:
+    """
+    Versión barata del estado: (escrituras locales, mtime ns de data.json).
+    Cambia con cada escritura (set_schedule incluido), así que sirve para invalidar cachés derivados.
+    """
+    return _STATE_EPOCH, _data_mtime_ns()
 
 # -------------------- train settings --------------------
 
@@ -141,8 +219,8 @@ def _ensure_train(state: Dict[str, Any]):
         "post_full_on_monday": True
     })
 
-def set_train_config(*, drivers: List[str] | None = None, anchor_monday_iso: str | None = None, post_full_on_monday: bool | None = None):
-    state = _load()
+def set_train_config(*, drivers: List[str] | None = None, anchor_monday_iso: str | None = None, post_full_on_monday: bool | None = None, _state: Dict[str, Any] | None = None):
+    state = _load() if _state is None else _state
     _ensure_train(state)
     if drivers is not None:
         state["train"]["drivers"] = drivers[:10]
@@ -150,12 +228,32 @@ def set_train_config(*, drivers: List[str] | None = None, anchor_monday_iso: str
         state["train"]["anchor_monday"] = anchor_monday_iso
     if post_full_on_monday is not None:
         state["train"]["post_full_on_monday"] = bool(post_full_on_monday)
-    _save(state)
+    if _state is None:
+        _save(state)
 
 def get_train_config() -> Dict[str, Any]:
-    state = _load()
-    _ensure_train(state)
-    return state["train"]
+    train = _peek().get("train")
+    if train is None:
+        # Sin config guardada: los mismos defaults que _ensure_train, en un dict propio
+        state: Dict[str, Any] = {}
+        _ensure_train(state)
+        return state["train"]
+    return _clone(train)
+
+@lru_cache(maxsize=8)
+def _parse_anchor(iso: str | None) -> date | None:
+    try:
+        return date.fromisoformat(iso) if iso else None
+    except (TypeError, ValueError):
+        return None
+
+def get_train_anchor() -> date | None:
+    """anchor_monday ya como date (None si no hay o es inválido); se parsea una vez por valor guardado."""
+    return _parse_anchor((_peek().get("train") or {}).get("anchor_monday"))
+
+def get_train_config_version() -> tuple[int, int | None]:
+    # La config de train vive en el mismo data.json
+    return get_state_version()
 
 # -------------------- auto toggles & marks --------------------
 
@@ -165,27 +263,25 @@ def _ensure_auto(state: Dict[str, Any]):
     })
     state.setdefault("fired_marks", {})  # { key: iso_ts }
 
-def set_auto_toggle(name: str, value: bool) -> None:
-    state = _load()
+def set_auto_toggle(name: str, value: bool, *, _state: Dict[str, Any] | None = None) -> None:
+    state = _load() if _state is None else _state
     _ensure_auto(state)
     state["auto"][name] = bool(value)
-    _save(state)
+    if _state is None:
+        _save(state)
 
 def get_auto_toggle(name: str) -> Optional[bool]:
-    state = _load()
-    _ensure_auto(state)
-    return state["auto"].get(name)
+    return (_peek().get("auto") or {}).get(name)
 
-def mark_fired(key: str) -> None:
-    state = _load()
+def mark_fired(key: str, *, _state: Dict[str, Any] | None = None) -> None:
+    state = _load() if _state is None else _state
     _ensure_auto(state)
     state["fired_marks"][key] = datetime.now(UTC).isoformat()
-    _save(state)
+    if _state is None:
+        _save(state)
 
 def has_fired(key: str) -> bool:
-    state = _load()
-    _ensure_auto(state)
-    return key in state.get("fired_marks", {})
+    return key in (_peek().get("fired_marks") or {})
 
 # -------------------- CSV helpers (same contract as antes) --------------------
 from .utils.csv_utils import append_sorteo, week_csv_names, append_registro
@@ -193,18 +289,49 @@ from .utils.date_utils import to_game_date, from_game_date, yyyymmdd, yyyymmdd_f
 
 # Expose append_sorteo and names so other modules import from storage if desired
 __all__ = [
-    "set_schedule", "get_schedule",
-    "set_train_config", "get_train_config",
+    "transaction",
+    "set_schedule", "get_schedule", "get_state_version", "last_write_at",
+    "set_train_config", "get_train_config", "get_train_anchor", "get_train_config_version",
     "set_auto_toggle", "get_auto_toggle",
     "mark_fired", "has_fired",
     "append_sorteo", "week_csv_names",
-    "register_points", "weekly_summary",
+    "register_points", "weekly_summary", "reset_current_week", "reset_all_state",
 ]
 
 # -------------------- points registry (VS) --------------------
 
+def _merge_day_entries(entries: List[Dict[str, Any]]) -> Dict[str, int]:
+    # Formato antiguo [{name, points}, ...] → {display: puntos}, fusionando duplicados del MISMO día
+    # (case/espacios/typo ASCII leve) igual que lo hacía weekly_summary.
+    merged: Dict[str, int] = {}
+    display: Dict[str, str] = {}  # clave interna -> display consolidado
+    for e in entries:
+        raw_name = str(e.get("name", ""))
+        pts = int(e.get("points", 0))
+        hit_key = next((k for k in display if _names_equivalent(k, raw_name)), None)
+        if hit_key is None:
+            display[raw_name] = _collapse_spaces(raw_name)
+            merged[raw_name] = pts
+        else:
+            display[hit_key] = _pick_display_name(display[hit_key], raw_name)
+            merged[hit_key] += pts
+    out: Dict[str, int] = {}
+    for k, v in merged.items():
+        out[display[k]] = out.get(display[k], 0) + v
+    return out
+
+def _migrate_points(state: Dict[str, Any]) -> None:
+    # Formato antiguo de días como lista → {name: points}; se aplica al parsear data.json
+    # y se persiste con la próxima escritura
+    for week in (state.get("points") or {}).values():
+        if not isinstance(week, dict):
+            continue
+        for dk, day in week.items():
+            if isinstance(day, list):
+                week[dk] = _merge_day_entries(day)
+
 def _ensure_points(state: Dict[str, Any]):
-    state.setdefault("points", {})  # {"YYYY-WW": {"YYYYMMDD": [ {name, points} ... ] } }
+    state.setdefault("points", {})  # {"YYYY-WW": {"YYYYMMDD": {name: points} } }
 
 def _iso_week_key(d: date) -> str:
     iso = d.isocalendar()
@@ -226,7 +353,7 @@ _DAY_OFFSETS = {
     "lun": 0, "mar": 1, "mie": 2, "mié": 2, "jue": 3, "vie": 4, "sab": 5, "sáb": 5,
 }
 
-def register_points(name: str, amount: int, day: str | None = None, ref_date: date | datetime | None = None) -> Tuple[str, str, int]:
+def register_points(name: str, amount: int, day: str | None = None, ref_date: date | datetime | None = None, *, _state: Dict[str, Any] | None = None) -> Tuple[str, str, int]:
     """
     Registra puntos para un jugador en la semana ISO del calendario de juego, con opción de
     referenciar explícitamente la semana (ref_date) para cerrar rezagos en domingo/lunes.
@@ -234,6 +361,7 @@ def register_points(name: str, amount: int, day: str | None = None, ref_date: da
     - amount: puntos enteros (se guarda como TOTAL del día)
     - day: opcional ('mon'..'sat' o abreviatura ES). Si None, usa el día de juego actual.
     - ref_date: opcional (date/datetime). Si se provee, esa fecha define la semana de juego destino.
+    - _state: estado abierto con transaction(); si se pasa, no se lee ni guarda data.json aquí.
     Reglas:
       * El evento VS corre de lun–sáb. El domingo puede registrar para lun–sáb de la semana que finaliza ese mismo domingo.
       * El lunes aún puede registrar para la semana pasada (cierre), pero nunca para futuro.
@@ -243,7 +371,7 @@ def register_points(name: str, amount: int, day: str | None = None, ref_date: da
     if not isinstance(amount, int):
         raise ValueError("amount must be integer")
 
-    state = _load()
+    state = _load() if _state is None else _state
     _ensure_points(state)
 
     # Base temporal: ahora o ref_date (si viene)
@@ -277,26 +405,21 @@ def register_points(name: str, amount: int, day: str | None = None, ref_date: da
     date_key = yyyymmdd_from_date(target)
 
     week_bucket = state["points"].setdefault(week_key, {})
-    day_list: List[Dict[str, Any]] = week_bucket.setdefault(date_key, [])
+    day_bucket: Dict[str, int] = week_bucket.setdefault(date_key, {})
 
     # Sobrescribir: eliminar registros previos equivalentes a este jugador (reglas lógicas)
     existing_display = None
-    to_keep = []
-    for e in day_list:
-        ename = str(e.get("name", ""))
-        if _names_equivalent(ename, name):
-            existing_display = ename if existing_display is None else _pick_display_name(existing_display, ename)
-            # omitimos este registro (lo reemplazaremos)
-        else:
-            to_keep.append(e)
-    day_list[:] = to_keep
+    for ename in [k for k in day_bucket if _names_equivalent(k, name)]:
+        existing_display = ename if existing_display is None else _pick_display_name(existing_display, ename)
+        del day_bucket[ename]  # lo reemplazaremos
 
     display_name = existing_display or _collapse_spaces(name)
 
-    # Insertar la nueva entrada como TOTAL del día
-    day_list.append({"name": display_name, "points": int(amount)})
+    # Guardar como TOTAL del día
+    day_bucket[display_name] = int(amount)
 
-    _save(state)
+    if _state is None:
+        _save(state)
 
     # CSV: fecha_dia,nombre_comandante,puntos (se guarda el total)
     dt_utc = datetime.combine(target, time(0, 0, tzinfo=UTC))
@@ -304,21 +427,46 @@ def register_points(name: str, amount: int, day: str | None = None, ref_date: da
 
     return week_key, date_key, int(amount)
 
+def reset_current_week() -> bool:
+    """
+    Borra los puntos guardados de la semana de juego actual (los CSV no se tocan).
+    Solo escribe data.json si había algo que borrar. Devuelve True si se borró algo.
+    """
+    state = _load()
+    week_key = _iso_week_key(to_game_date(datetime.now(UTC)))
+    removed = False
+    # "weeks" es la clave de versiones anteriores del estado
+    for bucket in ("points", "weeks"):
+        if (state.get(bucket) or {}).pop(week_key, None) is not None:
+            removed = True
+    if removed:
+        _save(state)
+    return removed
+
+@lru_cache(maxsize=8)
+def _monsat_keys(monday: date) -> Tuple[str, ...]:
+    # Claves YYYYMMDD de lun–sáb de la semana, por aritmética de ordinales
+    base = monday.toordinal()
+    return tuple(yyyymmdd_from_date(date.fromordinal(base + i)) for i in range(6))
+
+# Resúmenes recientes (pocas semanas distintas a la vez), como instantáneas privadas
+_SUMMARY_CACHE: Dict[tuple, Dict[str, Any]] = {}
+_SUMMARY_CACHE_MAX = 4
+
 def weekly_summary(ref_date: datetime | date | None = None) -> Dict[str, Any]:
     """
     Devuelve un resumen de la semana del calendario de juego que contiene ref_date.
     Si ref_date es None, usa la semana actual.
       {
         'week': 'YYYY-WW',
-        'days': { 'YYYYMMDD': [{'name':..., 'points':...}, ...], ... },
+        'days': { 'YYYYMMDD': {name: points, ...}, ... },
         'eligibles_by_day': { 'YYYYMMDD': [names ...], ... },
         'averages': { 'name': average_mon_to_sat },
+        'days_count': { 'name': días con registro },   (mismas claves que 'averages')
+        'hit_days': { 'name': días >= THRESHOLD },
       }
     La elegibilidad diaria es >= THRESHOLD. Promedios: media de los días con registro (lun–sáb).
     """
-    state = _load()
-    _ensure_points(state)
-
     if ref_date is None:
         base_dt = datetime.now(UTC)
     else:
@@ -331,68 +479,55 @@ def weekly_summary(ref_date: datetime | date | None = None) -> Dict[str, Any]:
     monday = _monday_of_game_week(game_today)
     week_key = _iso_week_key(game_today)
 
-    days: Dict[str, List[Dict[str, Any]]] = state.get("points", {}).get(week_key, {})
+    # Memo por (semana, escrituras locales, mtime de data.json): cualquier escritura lo invalida
+    cache_key = (week_key, _STATE_EPOCH, _data_mtime_ns())
+    cached = _SUMMARY_CACHE.get(cache_key)
+    if cached is not None:
+        return _clone(cached)
+
+    # Solo lectura sobre el estado cacheado (sin copia completa); 'days' se copia al armar el resumen
+    days: Dict[str, Dict[str, int]] = (_peek().get("points") or {}).get(week_key) or {}
 
     eligibles_by_day: Dict[str, List[str]] = {}
     sums: Dict[str, int] = {}
     counts: Dict[str, int] = {}
+    hits: Dict[str, int] = {}
 
     # recorrer lun–sáb
-    for i in range(6):
-        d = monday + timedelta(days=i)
-        dk = yyyymmdd_from_date(d)
-        entries = days.get(dk, [])
-
-        # Consolida duplicados obvios del MISMO día (case/espacios/typo ASCII leve).
-        per_day_merged: Dict[str, int] = {}
-        per_day_display: Dict[str, str] = {}  # clave interna -> display consolidado
-
-        for e in entries:
-            raw_name = str(e.get("name", ""))
-            pts = int(e.get("points", 0))
-
-            hit_key = None
-            for k in per_day_display.keys():
-                if _names_equivalent(k, raw_name):
-                    hit_key = k
-                    break
-            if hit_key is None:
-                per_day_display[raw_name] = _collapse_spaces(raw_name)
-                per_day_merged[raw_name] = pts
-            else:
-                new_disp = _pick_display_name(per_day_display[hit_key], raw_name)
-                if new_disp != per_day_display[hit_key]:
-                    per_day_display[hit_key] = new_disp
-                per_day_merged[hit_key] = per_day_merged.get(hit_key, 0) + pts
-
-        # elegibles del día (usando displays consolidados)
-        eligibles_by_day[dk] = [
-            per_day_display[k]
-            for k, v in per_day_merged.items()
-            if int(v) >= THRESHOLD
-        ]
+    for dk in _monsat_keys(monday):
+        # {display: total}; register_points/_migrate_points ya fusionan duplicados del mismo día
+        day = days.get(dk)
+        if not day:
+            eligibles_by_day[dk] = []
+            continue
+
+        # elegibles del día
+        eligibles_by_day[dk] = [n for n, v in day.items() if int(v) >= THRESHOLD]
 
         # acumular para promedios por jugador (fusión a nivel de semana)
-        for k, v in per_day_merged.items():
-            disp = per_day_display[k]
+        for disp, v in day.items():
+            v = int(v)
             hit_week = None
             for wk in list(sums.keys()):
                 if _names_equivalent(wk, disp):
                     hit_week = wk
                     break
             if hit_week is None:
-                sums[disp] = int(v)
+                hit_week = disp
+                sums[disp] = 0
             else:
                 new_disp = _pick_display_name(hit_week, disp)
                 if new_disp != hit_week:
                     sums[new_disp] = sums.pop(hit_week)
-                    if hit_week in counts:
-                        counts[new_disp] = counts.pop(hit_week)
+                    counts[new_disp] = counts.pop(hit_week, 0)
+                    hits[new_disp] = hits.pop(hit_week, 0)
                     hit_week = new_disp
-                sums[hit_week] = sums.get(hit_week, 0) + int(v)
+            sums[hit_week] += v
 
-            # contamos el día si tuvo registro (para referencia); el promedio final divide entre 6 fijos
-            counts[disp] = counts.get(disp, 0) + 1
+            # días con registro y días >= THRESHOLD, con la misma clave fusionada que los promedios
+            counts[hit_week] = counts.get(hit_week, 0) + 1
+            if v >= THRESHOLD:
+                hits[hit_week] = hits.get(hit_week, 0) + 1
 
     # Promedios sobre 6 días fijos (Mon–Sat). Días sin registro cuentan como 0.
     if sums:
@@ -400,9 +535,16 @@ def weekly_summary(ref_date: datetime | date | None = None) -> Dict[str, Any]:
     else:
         averages = {}
 
-    return {
+    summary = {
         "week": week_key,
-        "days": days,
+        "days": _clone(days),
         "eligibles_by_day": eligibles_by_day,
         "averages": averages,
+        "days_count": {n: counts.get(n, 0) for n in averages},
+        "hit_days": {n: hits.get(n, 0) for n in averages},
     }
+    if len(_SUMMARY_CACHE) >= _SUMMARY_CACHE_MAX:
+        _SUMMARY_CACHE.clear()
+    # Se guarda una instantánea propia y se entrega una copia: mutar el resultado no altera la caché
+    _SUMMARY_CACHE[cache_key] = _clone(summary)
+    return summary
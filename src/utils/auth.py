@@ -0,0 +1,34 @@
+# ===============================
+# src/utils/auth.py
+# ===============================
+# Permisos compartidos por los comandos (Admin/Official)
+from __future__ import annotations
+import functools
+import inspect
+from ..config import ALLOWED_ROLE_NAMES
+
+
+def has_role(member) -> bool:
+    # Administradores del servidor pasan directo (pueden asignarse cualquier rol de todos modos)
+    if getattr(getattr(member, "guild_permissions", None), "administrator", False):
+        return True
+    # isdisjoint recorre los roles en C y corta en el primero que coincide
+    return not ALLOWED_ROLE_NAMES.isdisjoint(r.name for r in getattr(member, "roles", ()))
+
+
+def require_role(func):
+    """
+    Corta el comando con "No permission." si el usuario no es Admin/Official.
+    Va debajo de @app_commands.command/describe/choices. Fuera de un servidor (DM) el
+    usuario no tiene roles, así que también se rechaza.
+    """
+    @functools.wraps(func)
+    async def wrapper(interaction, *args, **kwargs):
+        if not has_role(interaction.user):
+            return await interaction.response.send_message("No permission.", ephemeral=True)
+        return await func(interaction, *args, **kwargs)
+
+    # discord.py resuelve anotaciones en texto con los globals del callback (los de este módulo):
+    # se dejan ya evaluadas en la firma del comando original.
+    wrapper.__signature__ = inspect.signature(func, eval_str=True)
+    return wrapper
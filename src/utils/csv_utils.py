@@ -1,11 +1,20 @@
 # ===============================
 # src/utils/csv_utils.py
 # ===============================
+import csv
 import os
+import re
 from datetime import datetime, timedelta
 from ..config import DATA_DIR
 from .date_utils import iso_week_key, yyyymmdd, UTC
 
+# Buffer de E/S para barridos/escrituras de CSV semanales (menos syscalls que el default de 8 KiB)
+CSV_BUFFER_SIZE = 1 << 16
+
+_HEADER_REGISTROS = "fecha_dia,nombre_comandante,puntos\n"
+_HEADER_SORTEOS = "fecha,semana,tipo,detalle\n"
+_WEEK_FILE_RE = re.compile(r"^Vs(\d{8})_(registros|sorteos)\.csv$")
+
 
 def ensure_dir(path: str) -> None:
     if not os.path.exists(path):
@@ -39,34 +48,87 @@ def _escape_csv(s: str) -> str:
     return s
 
 
+def _append_lines(path: str, header: str, lines: list[str]) -> None:
+    # Escritura síncrona: la fila está en disco al volver y los errores llegan al comando
+    header_needed = not os.path.exists(path)
+    with open(path, "a", encoding="utf-8", newline="", buffering=CSV_BUFFER_SIZE) as f:
+        if header_needed:
+            f.write(header)
+        f.write("".join(lines))
+
+
 def append_registro(dt: datetime, name: str, points: int) -> None:
     paths = week_csv_names(dt)
-    file = paths["registros"]
-    header_needed = not os.path.exists(file)
-    with open(file, "a", encoding="utf-8") as f:
-        if header_needed:
-            f.write("fecha_dia,nombre_comandante,puntos\n")
-        f.write(f"{yyyymmdd(dt)},{_escape_csv(name)},{points}\n")
+    _append_lines(paths["registros"], _HEADER_REGISTROS, [f"{yyyymmdd(dt)},{_escape_csv(name)},{points}\n"])
 
 
 def append_sorteo(dt: datetime, kind: str, detail: str) -> None:
     # kind: "D" (daily) | "W" (weekly) | "weekend"
+    append_sorteos_bulk(dt, kind, [detail])
+
+
+def append_sorteos_bulk(dt: datetime, kind: str, details: list[str]) -> None:
+    # Igual que append_sorteo, pero varias filas del mismo tipo con un solo open/write
+    if not details:
+        return
     paths = week_csv_names(dt)
-    file = paths["sorteos"]
-    header_needed = not os.path.exists(file)
-    with open(file, "a", encoding="utf-8") as f:
-        if header_needed:
-            f.write("fecha,semana,tipo,detalle\n")
-        f.write(f"{yyyymmdd(dt)},{iso_week_key(dt)},{_escape_csv(kind)},{_escape_csv(detail)}\n")
+    prefix = f"{yyyymmdd(dt)},{iso_week_key(dt)},{_escape_csv(kind)},"
+    _append_lines(paths["sorteos"], _HEADER_SORTEOS, [f"{prefix}{_escape_csv(d)}\n" for d in details])
+
+
+def iter_sorteos_rows(f):
+    """
+    (tipo, detalle) por fila de un CSV de sorteos abierto en texto.
+    csv.reader + índices de columna tomados del header una vez (sin dict por fila).
+    Igual que DictReader: salta líneas vacías y columnas faltantes quedan en "".
+    """
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if not header:
+        return
+    i_tipo = header.index("tipo")
+    i_det = header.index("detalle")
+    for row in reader:
+        if not row:
+            continue
+        n = len(row)
+        yield (row[i_tipo] if i_tipo < n else ""), (row[i_det] if i_det < n else "")
+
+
+# Índices derivados de un CSV: {(build, path): ((mtime ns, tamaño), índice)}
+_FILE_INDEX_CACHE: dict[tuple, tuple[tuple[int, int], object]] = {}
+
+
+def cached_file_index(path: str, build, default):
+    """
+    build(f) sobre el archivo abierto en texto, una sola vez por versión del archivo (mtime ns + tamaño).
+    Si el archivo no existe o build falla se devuelve `default` sin cachear: la próxima llamada reintenta.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return default
+    stamp = (st.st_mtime_ns, st.st_size)
+    key = (build, path)
+    hit = _FILE_INDEX_CACHE.get(key)
+    if hit is not None and hit[0] == stamp:
+        return hit[1]
+    try:
+        with open(path, "r", encoding="utf-8", newline="", buffering=CSV_BUFFER_SIZE) as f:
+            index = build(f)
+    except Exception:
+        return default
+    # stamp es previo a la lectura: si el archivo cambió mientras tanto, la próxima llamada reconstruye
+    _FILE_INDEX_CACHE[key] = (stamp, index)
+    return index
 
 
 def list_weeks_in_folder():
     ensure_dir(DATA_DIR)
     files = [f for f in os.listdir(DATA_DIR) if f.startswith("Vs") and f.endswith(".csv")]
     by = {}
-    import re
     for f in files:
-        m = re.match(r"^Vs(\d{8})_(registros|sorteos)\.csv$", f)
+        m = _WEEK_FILE_RE.match(f)
         if not m:
             continue
         sunday, kind = m.group(1), m.group(2)
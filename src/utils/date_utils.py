@@ -3,6 +3,7 @@
 # ===============================
 from __future__ import annotations
 from datetime import datetime, timedelta, timezone, time, date
+from functools import lru_cache
 from typing import List, Tuple
 from ..config import GAME_CUTOVER_UTC
 
@@ -24,11 +25,14 @@ def to_game_date(dt: datetime) -> date:
     return (dt - timedelta(days=1)).date()
 
 
+# Funciones puras sobre fechas (date): se cachean (draw/scheduler repiten las mismas entradas)
+@lru_cache(maxsize=256)
 def from_game_date(d: date) -> datetime:
     """Map a game-day date to a stable UTC datetime (noon UTC)."""
     return datetime(d.year, d.month, d.day, 12, 0, 0, tzinfo=UTC)
 
 
+@lru_cache(maxsize=256)
 def yyyymmdd_from_date(d: date) -> str:
     return d.strftime("%Y%m%d")
 
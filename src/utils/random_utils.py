@@ -0,0 +1,20 @@
+# ===============================
+# src/utils/random_utils.py
+# ===============================
+# Sorteos: Fisher–Yates parcial (solo k intercambios/llamadas al RNG en vez de barajar todo el pool)
+from __future__ import annotations
+import random
+
+
+def partial_shuffle(pool: list, k: int) -> None:
+    """Deja en pool[:k] una muestra al azar (en orden al azar). Reordena `pool` en sitio."""
+    n = len(pool)
+    for i in range(min(k, n)):
+        j = random.randrange(i, n)
+        pool[i], pool[j] = pool[j], pool[i]
+
+
+def sample_k(pool: list, k: int) -> list:
+    """Hasta k elementos al azar de `pool` (que se reordena en sitio: pasar una lista propia)."""
+    partial_shuffle(pool, k)
+    return pool[:k]
@@ -26,11 +26,10 @@
 from __future__ import annotations
 from datetime import date, datetime, timedelta, timezone
 from typing import Dict, List, Optional, Tuple
-import csv
 import os
 import re
 
-from .csv_utils import week_csv_names
+from .csv_utils import week_csv_names, iter_sorteos_rows, cached_file_index
 from .date_utils import yyyymmdd
 
 UTC = timezone.utc
@@ -124,6 +123,7 @@ def _norm_day_key(s: str) -> Optional[str]:
 _re_block_split = re.compile(r"[;,]\s*")
 _re_kv = re.compile(r"(?P<k>[a-zA-Záéíóúñ]+)\s*[:=]\s*(?P<v>.+)$")
 _re_inner_b = re.compile(r"\b(b1|b2)\s*[:=]\s*([^|,;]+)")
+_re_prefix = re.compile(r"(?:weekend|W|D)\|")
 
 def _parse_weekly_detail(detail: str) -> Dict[str, Dict[str, str]]:
     """
@@ -216,8 +216,6 @@ def _this_week_ref(d: date) -> datetime:
 
 # ---------- parse 'detalle' key:value pairs (pipe-separated) ----------
 
-_re_kv_pipe = re.compile(r"([a-zA-Z_]+):([^|]+)")
-
 def _parse_pipe_kv(detail: str) -> Dict[str, str]:
     """
     Parses pipe-separated key:value pairs:
@@ -225,69 +223,73 @@ def _parse_pipe_kv(detail: str) -> Dict[str, str]:
     Ignores the leading "W|" or "D|" or "weekend|".
     """
     s = detail or ""
-    # Remove leading type prefix if present
-    if s.startswith(("W|", "D|", "weekend|")):
-        s = s.split("|", 1)[1] if "|" in s else ""
+    # Remove leading type prefix if present ("W|", "D|", "weekend|")
+    m = _re_prefix.match(s)
+    if m:
+        s = s[m.end():]
     out: Dict[str, str] = {}
-    for m in _re_kv_pipe.finditer(s):
-        k = m.group(1).strip().lower()
-        v = m.group(2).strip()
-        out[k] = v
+    for part in s.split("|"):
+        # un solo corte por parte; como antes, se ignoran partes sin ':' o con valor vacío
+        k, sep, v = part.partition(":")
+        if sep and v:
+            out[k.strip().lower()] = v.strip()
     return out
 
 # ---------- core search helpers ----------
 
+# Índice por CSV (cached_file_index: un solo recorrido del archivo por cada cambio).
+#   index["pick"]:   {(tipo, for): (fila, passenger, first_backup)}  (gana la primera fila)
+#   index["legacy"]: mapas W de una sola línea, en orden de archivo
+_EMPTY_INDEX: Dict[str, object] = {"pick": {}, "legacy": []}
+
+def _first_backup(backs: str) -> Optional[str]:
+    if not backs:
+        return None
+    first = (backs.split(",")[0] or "").strip()
+    return first or None
+
+def _build_index(f) -> Dict[str, object]:
+    pick: Dict[Tuple[str, str], Tuple[int, Optional[str], Optional[str]]] = {}
+    legacy: List[Dict[str, Dict[str, str]]] = []
+    for i, (tipo, det) in enumerate(iter_sorteos_rows(f)):
+        tipo = tipo.strip().lower()
+        kv = _parse_pipe_kv(det)
+        key = (tipo, kv.get("for"))
+        if key not in pick:
+            pick[key] = (i, kv.get("passenger"), _first_backup(kv.get("backups", "")))
+        if tipo == "w":
+            mapping = _parse_weekly_detail(det.strip())
+            if mapping:
+                legacy.append(mapping)
+    return {"pick": pick, "legacy": legacy}
+
+def _load_index(path: str) -> Dict[str, object]:
+    return cached_file_index(path, _build_index, _EMPTY_INDEX)
+
 def _find_per_day_pick(path: str, target_yymmdd: str, kinds: Tuple[str, ...]) -> Tuple[Optional[str], Optional[str]]:
     """
     Search for per-day W/D entries in CSV 'path' with for == target_yymmdd.
     Returns (passenger, first_backup) or (None, None).
     """
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                tipo = (row.get("tipo") or "").strip().lower()
-                if tipo not in {k.lower() for k in kinds}:
-                    continue
-                kv = _parse_pipe_kv(row.get("detalle") or "")
-                if kv.get("for") == target_yymmdd:
-                    pax = kv.get("passenger")
-                    bkp = None
-                    backs = kv.get("backups", "")
-                    if backs:
-                        first = (backs.split(",")[0] or "").strip()
-                        bkp = first or None
-                    return pax, bkp
-    except Exception:
-        pass
-    return (None, None)
+    pick = _load_index(path)["pick"]
+    hits = [pick[k] for k in {(kd.lower(), target_yymmdd) for kd in kinds} if k in pick]
+    if not hits:
+        return (None, None)
+    _, pax, bkp = min(hits)  # la primera fila del archivo entre los tipos pedidos
+    return pax, bkp
 
 def _find_weekly_map_pick(path: str, target_day_key: str) -> Tuple[Optional[str], Optional[str]]:
     """
     Legacy support: find a single W row with a Mon–Fri mapping in 'detalle' and get
     passenger/b1 for the given weekday key (mon..fri).
     """
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                tipo = (row.get("tipo") or "").strip().lower()
-                if tipo != "w":
-                    continue
-                det = (row.get("detalle") or "").strip()
-                # If it's a per-day W, _parse_pipe_kv will catch it earlier in _find_per_day_pick.
-                # Here we try legacy multi-day map:
-                mapping = _parse_weekly_detail(det)
-                if not mapping:
-                    continue
-                entry = mapping.get(target_day_key)
-                if entry:
-                    pax = entry.get("pax")
-                    bkp = entry.get("b1") or entry.get("b2")
-                    if pax:
-                        return pax, bkp
-    except Exception:
-        pass
+    for mapping in _load_index(path)["legacy"]:
+        entry = mapping.get(target_day_key)
+        if entry:
+            pax = entry.get("pax")
+            bkp = entry.get("b1") or entry.get("b2")
+            if pax:
+                return pax, bkp
     return (None, None)
 
 # ---------- main API ----------